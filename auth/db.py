@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    Connections are handed out LIFO so the warmest ones are reused first.
+    A checkout blocks for at most `timeout` seconds when every connection
+    is in use, and connections idle for longer than `healthcheck_after`
+    seconds are pinged before being handed out. With `autocommit` every
+    statement commits on its own, saving the COMMIT round trip for services
+    that only run single-statement transactions.
+    """
+
+    def __init__(self, minconn, maxconn, timeout=5.0, healthcheck_after=30.0, autocommit=False,
+                 **connect_kwargs):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError('Invalid pool size: min=%s max=%s' % (minconn, maxconn))
+
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_after = healthcheck_after
+        self.autocommit = autocommit
+        self._connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._in_use = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._wait_seconds = 0.0
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        conn.autocommit = self.autocommit
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._discarded += 1
+
+    def _is_healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - last_used < self.healthcheck_after:
+            return True
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1;")
+            cursor.close()
+            if not conn.autocommit:
+                conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        conn = None
+        last_used = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError('Connection pool is closed')
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._in_use < self.maxconn:
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        'Timed out after %.1fs waiting for a database connection' % self.timeout
+                    )
+                self._cond.wait(remaining)
+
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_seconds += time.monotonic() - started
+
+        try:
+            if conn is not None and not self._is_healthy(conn, last_used):
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return conn
+
+    def putconn(self, conn, broken=False):
+        if not broken and not conn.closed:
+            status = conn.get_transaction_status()
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                broken = True
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+
+        if broken or conn.closed or self._closed:
+            self._discard(conn)
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.InterfaceError, psycopg2.OperationalError):
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, broken=broken)
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'minSize': self.minconn,
+                'maxSize': self.maxconn,
+                'size': self._in_use + len(self._idle),
+                'inUse': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'connectionsCreated': self._created,
+                'connectionsDiscarded': self._discarded,
+                'waitSecondsTotal': round(self._wait_seconds, 6),
+            }
+
+
+def create_pool_from_env(autocommit=False, cursor_factory=None):
+    return ConnectionPool(
+        minconn=int(os.getenv("POSTGRES_POOL_MIN", 1)),
+        maxconn=int(os.getenv("POSTGRES_POOL_MAX", 10)),
+        timeout=float(os.getenv("POSTGRES_POOL_TIMEOUT", 5)),
+        healthcheck_after=float(os.getenv("POSTGRES_POOL_HEALTHCHECK_AFTER", 30)),
+        autocommit=autocommit,
+        cursor_factory=cursor_factory,
+        host=os.getenv("POSTGRES_HOST"),
+        database=os.getenv("POSTGRES_DB"),
+        user=os.getenv("POSTGRES_USER"),
+        password=os.getenv("POSTGRES_PASSWORD"),
+    )
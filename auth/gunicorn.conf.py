@@ -0,0 +1,47 @@
+import multiprocessing
+import os
+import shutil
+
+# Production server settings for the auth service, read by `gunicorn main:app`.
+# Every worker process opens its own connection pool on first use, so the
+# database sees up to workers * POSTGRES_POOL_MAX connections. Send SIGHUP to
+# the master to start workers on reloaded code and gracefully stop the old ones.
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:3100")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def on_starting(server):
+    # Metrics files of a previous run would be summed into the new one's
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir)
+
+
+def post_fork(server, worker):
+    # A pool inherited from the master would share its sockets with every
+    # worker; drop the reference so the worker connects on its own.
+    import main
+    main.db_pool = None
+
+
+def worker_exit(server, worker):
+    import main
+    if main.db_pool is not None:
+        main.db_pool.closeall()
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,68 +1,58 @@
 import datetime
 import hashlib
 import os
+import threading
 import jwt
-import psycopg2
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flasgger import Swagger
 
+from db import create_pool_from_env
+from metrics import TimedCursor, instrument, timed, timed_connection
+
 app = Flask(__name__)
 CORS(app)
 swagger = Swagger(app)
 app.config['SECRET_KEY'] = os.getenv("SECRET_KEY", "my-secret-key")
+instrument(app, lambda: db_pool)
 
 
-def get_db_connection():
-    return psycopg2.connect(
-        host=os.getenv("POSTGRES_HOST"),
-        database=os.getenv("POSTGRES_DB"),
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD")
-    )
+db_pool = None
+db_pool_lock = threading.Lock()
 
 
-def generate_tokens(user_id, username, role):
-    payload = {
-        'user_id': user_id,
-        'username': username,
-        'role': role,
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=15)
-    }
-    access_token = jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
-
-    refresh_payload = {
-        'user_id': user_id,
-        'username': username,
-        'role': role,
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(days=7)
-    }
-    refresh_token = jwt.encode(refresh_payload, app.config['SECRET_KEY'], algorithm='HS256')
+def get_db_pool():
+    global db_pool
+    if db_pool is None:
+        with db_pool_lock:
+            if db_pool is None:
+                db_pool = create_pool_from_env(autocommit=True, cursor_factory=TimedCursor)
+    return db_pool
 
-    return access_token, refresh_token
 
+def get_db_connection():
+    return timed_connection(get_db_pool().connection())
 
-def check_user_exists(username):
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        query = """
-        SELECT
-            username
-        FROM
-            users
-        WHERE
-            username = %s;
-        """
-        cursor.execute(query, (username,))
-        result = cursor.fetchone()
-
-        conn.close()
-        return result is not None
 
-    except Exception as e:
-        return jsonify({str(e)}), 500
+def generate_tokens(user_id, username, role):
+    with timed('auth'):
+        payload = {
+            'user_id': user_id,
+            'username': username,
+            'role': role,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=15)
+        }
+        access_token = jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
+
+        refresh_payload = {
+            'user_id': user_id,
+            'username': username,
+            'role': role,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(days=7)
+        }
+        refresh_token = jwt.encode(refresh_payload, app.config['SECRET_KEY'], algorithm='HS256')
+
+    return access_token, refresh_token
 
 
 @app.route('/auth/register', methods=['POST'])
@@ -99,26 +89,26 @@ def register():
     if not all([username, password]):
         return jsonify({'error': 'All fields are required'}), 400
 
-    if check_user_exists(username):
-        return jsonify({'error': 'Username already exists'}), 400
-
     try:
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        query = """
-        INSERT INTO 
-            users (username, password)
-        VALUES 
-            (%s, %s)
-        RETURNING user_id;
-        """
-        cursor.execute(query, (username, hashed_password))
-        user_id = cursor.fetchone()[0]
-        conn.commit()
-
-        access_token, refresh_token = generate_tokens(user_id, username, 'user')
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            query = """
+            INSERT INTO 
+                users (username, password)
+            VALUES 
+                (%s, %s)
+            ON CONFLICT (username) DO NOTHING
+            RETURNING user_id;
+            """
+            cursor.execute(query, (username, hashed_password))
+            result = cursor.fetchone()
+
+        if result is None:
+            return jsonify({'error': 'Username already exists'}), 400
+
+        access_token, refresh_token = generate_tokens(result[0], username, 'user')
         return jsonify({'access_token': access_token, 'refresh_token': refresh_token}), 200
 
     except Exception as e:
@@ -163,21 +153,20 @@ def login():
 
     try:
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        query = """
-            SELECT
-                user_id, username, role
-            FROM
-                users
-            WHERE
-                username = %s AND password = %s;
-        """
-        cursor.execute(query, (username, hashed_password))
-        result = cursor.fetchone()
-
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            query = """
+                SELECT
+                    user_id, username, role
+                FROM
+                    users
+                WHERE
+                    username = %s AND password = %s;
+            """
+            cursor.execute(query, (username, hashed_password))
+            result = cursor.fetchone()
+
         if result:
             user_id, username, role = result
             access_token, refresh_token = generate_tokens(user_id, username, role)
@@ -217,14 +206,15 @@ def refresh_token():
         return jsonify({'error': 'Refresh token required'}), 400
 
     try:
-        decoded = jwt.decode(refresh_token, app.config['SECRET_KEY'], algorithms=['HS256'])
-        user_id = decoded['user_id']
-
-        payload = {
-            'user_id': user_id,
-            'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=15)
-        }
-        new_access_token = jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
+        with timed('auth'):
+            decoded = jwt.decode(refresh_token, app.config['SECRET_KEY'], algorithms=['HS256'])
+            user_id = decoded['user_id']
+
+            payload = {
+                'user_id': user_id,
+                'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=15)
+            }
+            new_access_token = jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
 
         return jsonify({'access_token': new_access_token}), 200
 
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2.extensions
+from flask import Response, request
+from flask.json import JSONEncoder
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Per-request timing of the phases a request spends its time in, returned in a
+# Server-Timing header and exported with pool usage as Prometheus metrics on
+# /metrics. Under gunicorn, set PROMETHEUS_MULTIPROC_DIR so /metrics reports
+# the sum over all workers rather than whichever worker answers the scrape.
+
+PHASE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests by route, method and status', ['route', 'method', 'status']
+)
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ['route', 'method'], buckets=PHASE_BUCKETS
+)
+PHASE_DURATION = Histogram(
+    'http_request_phase_duration_seconds',
+    'Time HTTP requests spend per phase: db_acquire (waiting for a pooled connection), auth (token checks), '
+    'db (statements and fetches), serialize (JSON encoding) and app (everything else)',
+    ['route', 'phase'],
+    buckets=PHASE_BUCKETS,
+)
+POOL_CONNECTIONS = Gauge(
+    'db_pool_connections', 'Pooled database connections by state', ['state'], multiprocess_mode='livesum'
+)
+POOL_MAX_CONNECTIONS = Gauge(
+    'db_pool_max_connections', 'Maximum size of the database connection pools', multiprocess_mode='livesum'
+)
+
+current = threading.local()
+
+
+def record(phase, seconds):
+    """Add `seconds` to `phase` of the request being served on this thread, if any."""
+    timings = getattr(current, 'timings', None)
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed(phase):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - started)
+
+
+@contextmanager
+def timed_connection(connection):
+    """Wrap a pool's connection() context manager, timing the checkout as db_acquire."""
+    started = time.perf_counter()
+    with connection as conn:
+        record('db_acquire', time.perf_counter() - started)
+        yield conn
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Cursor that times statements and fetches as the db phase; pass it as the pool's cursor_factory."""
+
+    def execute(self, query, vars=None):
+        with timed('db'):
+            return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        with timed('db'):
+            return super().executemany(query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        with timed('db'):
+            return super().copy_expert(sql, file, size)
+
+    def fetchone(self):
+        with timed('db'):
+            return super().fetchone()
+
+    def fetchmany(self, size=None):
+        with timed('db'):
+            return super().fetchmany(size) if size is not None else super().fetchmany()
+
+    def fetchall(self):
+        with timed('db'):
+            return super().fetchall()
+
+
+class TimedJSONEncoder(JSONEncoder):
+    def encode(self, o):
+        with timed('serialize'):
+            return super().encode(o)
+
+
+def route_label():
+    # The URL rule rather than the path, so ISBNs and ids do not each get a series
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def server_timing(timings, total):
+    phases = dict(timings, app=max(total - sum(timings.values()), 0.0), total=total)
+    return phases, ", ".join(f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in phases.items())
+
+
+def update_pool_metrics(pool):
+    if pool is None:
+        return
+    stats = pool.stats()
+    POOL_CONNECTIONS.labels('in_use').set(stats['inUse'])
+    POOL_CONNECTIONS.labels('idle').set(stats['idle'])
+    POOL_MAX_CONNECTIONS.set(stats['maxSize'])
+
+
+def metrics_registry():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def instrument(app, current_pool):
+    """
+    Time every request of `app` and serve its metrics on /metrics.
+
+    `current_pool` returns the service's connection pool, or None before the
+    first connection, for the pool usage gauges.
+    """
+    app.json_encoder = TimedJSONEncoder
+
+    @app.before_request
+    def start_timing():
+        current.timings = {}
+        current.started = time.perf_counter()
+
+    @app.after_request
+    def finish_timing(response):
+        timings = getattr(current, 'timings', None)
+        if timings is None:
+            return response
+        current.timings = None
+
+        route = route_label()
+        total = time.perf_counter() - current.started
+        phases, header = server_timing(timings, total)
+        response.headers['Server-Timing'] = header
+
+        REQUESTS.labels(route, request.method, response.status_code).inc()
+        REQUEST_DURATION.labels(route, request.method).observe(total)
+        for phase, seconds in phases.items():
+            if phase != 'total':
+                PHASE_DURATION.labels(route, phase).observe(seconds)
+        update_pool_metrics(current_pool())
+
+        return response
+
+    def metrics():
+        """
+        Prometheus metrics.
+        ---
+        responses:
+          200:
+            description: Request counters, latency and per-phase histograms and pool usage in the Prometheus text format
+        """
+        update_pool_metrics(current_pool())
+        return Response(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
@@ -0,0 +1,292 @@
+import json
+import os
+from decimal import Decimal
+
+import psycopg
+from aiohttp import web
+from psycopg_pool import AsyncConnectionPool
+from werkzeug.http import parse_etags
+
+from main import (
+    APPROXIMATE_COUNT_THRESHOLD,
+    BOOK_DETAILS_QUERY,
+    CART_CHECK_QUERY,
+    DATA_VERSIONS_QUERY,
+    SEARCH_MODES,
+    AuthError,
+    arg_flag,
+    authenticate,
+    book_details,
+    books_count_query,
+    books_estimate_query,
+    books_page_response,
+    build_books_page_query,
+    build_cart_query,
+    build_reviews_page_query,
+    build_search_filter,
+    cart_book,
+    count_cache,
+    count_cache_key,
+    data_versions_etag,
+    planned_rows,
+    reviews_page_response,
+)
+
+# Asyncio server for the read-heavy catalog routes. It serves the same URLs,
+# query parameters, JSON bodies, ETags and token checks as the Flask app in
+# main.py, whose query builders it reuses, but waits on Postgres without
+# holding a thread, so one process can keep thousands of slow clients open.
+
+routes = web.RouteTableDef()
+
+
+def json_default(value):
+    # Matches Flask's JSON encoder, which writes decimals as strings.
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def json_response(data, status=200):
+    return web.json_response(
+        data, status=status, dumps=lambda obj: json.dumps(obj, default=json_default, sort_keys=True)
+    )
+
+
+def create_pool():
+    return AsyncConnectionPool(
+        conninfo=psycopg.conninfo.make_conninfo(
+            host=os.getenv("POSTGRES_HOST"),
+            dbname=os.getenv("POSTGRES_DB"),
+            user=os.getenv("POSTGRES_USER"),
+            password=os.getenv("POSTGRES_PASSWORD"),
+        ),
+        min_size=int(os.getenv("POSTGRES_POOL_MIN", 1)),
+        max_size=int(os.getenv("POSTGRES_POOL_MAX", 10)),
+        timeout=float(os.getenv("POSTGRES_POOL_TIMEOUT", 5)),
+        kwargs={'autocommit': True},
+        open=False,
+    )
+
+
+def token_required(handler):
+    async def decorated(request):
+        try:
+            user_id = authenticate(request.headers.get('Authorization'))
+        except AuthError as e:
+            return json_response({'error': str(e)}, 401)
+
+        return await handler(request, user_id)
+
+    return decorated
+
+
+def conditional_get(*version_names):
+    """
+    Async counterpart of main.conditional_get: a strong ETag from the named
+    data_versions counters, and 304 when If-None-Match already matches.
+    """
+    def decorator(handler):
+        async def decorated(request, user_id):
+            try:
+                async with request.app['db_pool'].connection() as conn:
+                    cursor = await conn.execute(DATA_VERSIONS_QUERY, (list(version_names),))
+                    versions = dict(await cursor.fetchall())
+            except Exception as e:
+                return json_response({'error': str(e)}, 500)
+
+            etag = data_versions_etag(version_names, versions)
+            if parse_etags(request.headers.get('If-None-Match')).contains(etag):
+                return web.Response(status=304, headers={'ETag': f'"{etag}"'})
+
+            response = await handler(request, user_id)
+            if response.status == 200:
+                response.headers['ETag'] = f'"{etag}"'
+            return response
+
+        return decorated
+
+    return decorator
+
+
+async def count_books(conn, search_filter, filter_params, cache_key, approximate=False):
+    total = count_cache.get(cache_key)
+    if total is not None:
+        return total, False
+
+    if approximate:
+        cursor = await conn.execute(books_estimate_query(search_filter), tuple(filter_params))
+        estimate = planned_rows((await cursor.fetchone())[0])
+        if estimate >= APPROXIMATE_COUNT_THRESHOLD:
+            return estimate, True
+
+    cursor = await conn.execute(books_count_query(search_filter), tuple(filter_params))
+    total = (await cursor.fetchone())[0]
+
+    count_cache.set(cache_key, total)
+    return total, False
+
+
+@routes.get('/total-books')
+@token_required
+@conditional_get('catalog')
+async def get_total_books(request, user_id):
+    search_query = request.query.get('q', '')
+    search_mode = request.query.get('search_mode', 'basic')
+
+    if search_mode not in SEARCH_MODES:
+        return json_response({'error': 'Invalid search mode'}, 400)
+
+    search_filter, filter_params, _, _ = build_search_filter(search_query, search_mode)
+    cache_key = count_cache_key(search_query, search_mode)
+
+    try:
+        async with request.app['db_pool'].connection() as conn:
+            total_books, is_approximate = await count_books(
+                conn, search_filter, filter_params, cache_key, approximate=arg_flag('approximate', request.query)
+            )
+
+            return json_response({"totalBooks": total_books, "totalIsApproximate": is_approximate})
+
+    except Exception as e:
+        return json_response({"error": str(e)}, 500)
+
+
+@routes.get('/books')
+@token_required
+@conditional_get('catalog', 'inventory', 'ratings')
+async def get_books(request, user_id):
+    try:
+        page = build_books_page_query(request.query)
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+
+    try:
+        async with request.app['db_pool'].connection() as conn:
+            cursor = await conn.execute(page['query'], page['params'])
+            books = await cursor.fetchall()
+
+            total, total_is_approximate = page['total'], False
+            if page['window_total'] and books:
+                total = books[0][7]
+                count_cache.set(page['cache_key'], total)
+            elif page['include_total'] and total is None:
+                total, total_is_approximate = await count_books(
+                    conn, page['search_filter'], page['filter_params'], page['cache_key'],
+                    approximate=page['approximate_total']
+                )
+
+            return json_response(books_page_response(page, books, total, total_is_approximate))
+
+    except Exception as e:
+        return json_response({"error": str(e)}, 500)
+
+
+@routes.get('/book')
+@token_required
+@conditional_get('catalog', 'inventory', 'ratings')
+async def get_book(request, user_id):
+    isbn = request.query.get('isbn', '')
+
+    try:
+        async with request.app['db_pool'].connection() as conn:
+            cursor = await conn.execute(BOOK_DETAILS_QUERY, (isbn,))
+            book = await cursor.fetchone()
+
+            if book is None:
+                return json_response({"error": "Book not found"}, 404)
+
+            return json_response({"book": book_details(book)})
+
+    except Exception as e:
+        return json_response({"error": str(e)}, 500)
+
+
+@routes.get('/reviews')
+@token_required
+async def get_my_reviews(request, user_id):
+    try:
+        query, params, limit = build_reviews_page_query(user_id, request.query)
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+
+    try:
+        async with request.app['db_pool'].connection() as conn:
+            cursor = await conn.execute(query, params)
+            reviews = await cursor.fetchall()
+
+            return json_response(reviews_page_response(reviews, limit))
+
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+
+@routes.get('/cart')
+@token_required
+async def get_books_cart(request, user_id):
+    try:
+        query, params = build_cart_query(user_id, request.query)
+
+        async with request.app['db_pool'].connection() as conn:
+            cursor = await conn.execute(query, params)
+            rows = await cursor.fetchall()
+
+            return json_response({'booksCart': [cart_book(row) for row in rows]})
+
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+
+@routes.get('/cart/check')
+@token_required
+async def check_if_in_cart(request, user_id):
+    isbn = request.query.get('isbn')
+
+    if not isbn:
+        return json_response({'error': 'Missing required data'}, 400)
+
+    try:
+        async with request.app['db_pool'].connection() as conn:
+            cursor = await conn.execute(CART_CHECK_QUERY, (user_id, isbn))
+            result = await cursor.fetchone()
+
+        return json_response({'inCart': bool(result)})
+
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+
+@web.middleware
+async def cors(request, handler):
+    # Same open policy as flask_cors.CORS(app) on the Flask app.
+    if request.method == 'OPTIONS':
+        response = web.Response()
+        response.headers['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
+        if 'Access-Control-Request-Headers' in request.headers:
+            response.headers['Access-Control-Allow-Headers'] = request.headers['Access-Control-Request-Headers']
+    else:
+        response = await handler(request)
+
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+async def open_pool(app):
+    app['db_pool'] = create_pool()
+    await app['db_pool'].open()
+
+
+async def close_pool(app):
+    await app['db_pool'].close()
+
+
+async def create_app():
+    app = web.Application(middlewares=[cors])
+    app.add_routes(routes)
+    app.on_startup.append(open_pool)
+    app.on_cleanup.append(close_pool)
+    return app
+
+
+if __name__ == '__main__':
+    web.run_app(create_app(), host='0.0.0.0', port=int(os.getenv("ASYNC_PORT", 3051)))
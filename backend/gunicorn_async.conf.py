@@ -0,0 +1,19 @@
+import multiprocessing
+import os
+
+# Production server settings for the asyncio catalog server, read by
+# `gunicorn --config gunicorn_async.conf.py async_main:create_app`. Each worker
+# runs one event loop and opens its own psycopg pool in the app's on_startup
+# hook, after the fork, and closes it in on_cleanup, so no fork hooks are
+# needed: the database sees up to workers * POSTGRES_POOL_MAX connections.
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:3051")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() + 1))
+worker_class = "aiohttp.GunicornWebWorker"
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
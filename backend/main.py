@@ -1,57 +1,493 @@
+import base64
+import csv
+import hashlib
+import io
+import json
+import math
 import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import parse_qsl, urlencode, urlsplit
 
-import psycopg2
 import jwt
-from flask import Flask, request, jsonify
+import psycopg2.errors
+from flask import Flask, g, request, jsonify
 from flask_cors import CORS
 from functools import wraps
 from flasgger import Swagger
+from werkzeug.exceptions import HTTPException
+
+from db import create_pool_from_env
+from metrics import instrument, timed, timed_connection
+from query_log import SLOW_QUERY_THRESHOLD_MS, QueryLogCursor, query_stats
 
 app = Flask(__name__)
 CORS(app)
 swagger = Swagger(app)
 app.config['SECRET_KEY'] = os.getenv("SECRET_KEY", "my-secret-key")
+instrument(app, lambda: db_pool)
+
+
+db_pool = None
+db_pool_lock = threading.Lock()
+pinned_connection = threading.local()
+
+
+def get_db_pool():
+    global db_pool
+    if db_pool is None:
+        with db_pool_lock:
+            if db_pool is None:
+                db_pool = create_pool_from_env(cursor_factory=QueryLogCursor)
+    return db_pool
 
 
 def get_db_connection():
-    return psycopg2.connect(
-        host=os.getenv("POSTGRES_HOST"),
-        database=os.getenv("POSTGRES_DB"),
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD"),
-    )
+    conn = getattr(pinned_connection, 'conn', None)
+    if conn is not None:
+        return nullcontext(conn)
+    return timed_connection(get_db_pool().connection())
 
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
+@contextmanager
+def pin_db_connection():
+    """
+    Serve every get_db_connection() call on this thread from a single pooled connection.
+
+    The connection runs in autocommit mode while pinned so a failing
+    statement cannot abort the statements that follow it.
+    """
+    with timed_connection(get_db_pool().connection()) as conn:
+        conn.autocommit = True
+        pinned_connection.conn = conn
+        try:
+            yield conn
+        finally:
+            pinned_connection.conn = None
+            conn.autocommit = False
+
+
+def bump_data_versions(cursor, *names):
+    """
+    Advance the data_versions counters for `names` in the caller's transaction.
+
+    Conditional GETs derive their ETags from these counters, so every write
+    to the catalog, inventory, ratings or orders must bump the matching ones.
+    """
+    cursor.execute("""
+        UPDATE data_versions
+        SET Version = Version + 1
+        WHERE Name = ANY(%s);
+    """, (sorted(names),))
+
+
+DATA_VERSIONS_QUERY = """
+    SELECT Name, Version
+    FROM data_versions
+    WHERE Name = ANY(%s);
+"""
+
+
+def data_versions_etag(version_names, versions):
+    return "-".join(f"{name}.{versions.get(name, 0)}" for name in version_names)
+
+
+def conditional_get(*version_names):
+    """
+    Give a GET route a strong ETag built from the named data_versions counters.
+
+    A request whose If-None-Match matches the current counters is answered
+    with 304 without running the route. Apply below token_required. The
+    counters are left in g.data_versions; a route serving an older snapshot
+    sets g.response_data_versions so the ETag describes what was sent.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            try:
+                with get_db_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(DATA_VERSIONS_QUERY, (list(version_names),))
+                    versions = dict(cursor.fetchall())
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+
+            etag = data_versions_etag(version_names, versions)
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+
+            g.data_versions = versions
+            response = app.make_response(f(*args, **kwargs))
+            response_versions = g.pop('response_data_versions', versions)
+            if response.status_code == 200:
+                etag = data_versions_etag(version_names, response_versions)
+                if request.if_none_match.contains(etag):
+                    response = app.response_class(status=304)
+                response.set_etag(etag)
+            return response
+
+        return decorated
+
+    return decorator
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified access tokens, keyed by a SHA-256 digest of the token.
+
+    An entry is only served until the token's `exp`, after which the token
+    goes through jwt.decode again and is rejected as expired. A tampered
+    token has a different digest, so it always misses and is verified.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.time():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, token, user_id, exp):
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (user_id, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxSize': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+token_cache = TokenCache(max_entries=int(os.getenv("TOKEN_CACHE_SIZE", 10000)))
+
+
+class AuthError(Exception):
+    pass
+
+
+def authenticate(authorization):
+    """
+    Return the user id of the bearer token in an Authorization header.
 
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(" ")[1]
+    Verified tokens are served from token_cache until they expire. Raises
+    AuthError with the message for the 401 response.
+    """
+    token = None
+
+    if authorization:
+        parts = authorization.split(" ")
+        token = parts[1] if len(parts) > 1 else None
+
+    if not token:
+        raise AuthError('Token is missing')
+
+    with timed('auth'):
+        user_id = token_cache.get(token)
+        if user_id is None:
+            try:
+                data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+                user_id = data['user_id']
+            except jwt.ExpiredSignatureError:
+                raise AuthError('Token expired')
+            except jwt.InvalidTokenError:
+                raise AuthError('Invalid token')
 
-        if not token:
-            return jsonify({'error': 'Token is missing'}), 401
+            token_cache.set(token, user_id, data.get('exp'))
 
+    return user_id
+
+
+def token_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
         try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user_id = data['user_id']
-        except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'error': 'Invalid token'}), 401
+            current_user_id = authenticate(request.headers.get('Authorization'))
+        except AuthError as e:
+            return jsonify({'error': str(e)}), 401
 
         return f(current_user_id, *args, **kwargs)
 
     return decorated
 
 
+SEARCH_MODES = ('basic', 'fulltext')
+ISBN_PATTERN = re.compile(r'^(?:\d{9}[\dX]|\d{13})$')
+
+
+def normalize_isbn(value):
+    candidate = re.sub(r'[\s-]', '', value).upper()
+    return candidate if ISBN_PATTERN.match(candidate) else None
+
+
+def build_search_filter(search_query, search_mode):
+    """
+    Build the WHERE condition and relevance expression for a catalog search on `books b`.
+
+    `basic` keeps the original ILIKE matching. `fulltext` looks an ISBN up by
+    primary key, and otherwise matches the full-text vector or a trigram word
+    similarity on title/author (which tolerates typos), ranked by relevance.
+    Returns (condition, condition_params, rank, rank_params); rank is None
+    when results should keep the default ordering.
+    """
+    if search_mode == 'basic':
+        return (
+            "(b.Book_Title ILIKE %s OR b.Book_Author ILIKE %s OR b.ISBN ILIKE %s)",
+            [f"%{search_query}%", f"%{search_query}%", f"{search_query}"],
+            None,
+            []
+        )
+
+    search_query = search_query.strip()
+    if not search_query:
+        return "TRUE", [], None, []
+
+    isbn = normalize_isbn(search_query)
+    if isbn:
+        return "b.ISBN = %s", [isbn], None, []
+
+    condition = """(
+        b.Search_Vector @@ WEBSEARCH_TO_TSQUERY('english', %s)
+        OR %s <%% b.Book_Title
+        OR %s <%% b.Book_Author
+    )"""
+    rank = """(
+        TS_RANK_CD(b.Search_Vector, WEBSEARCH_TO_TSQUERY('english', %s))
+        + GREATEST(WORD_SIMILARITY(%s, b.Book_Title), WORD_SIMILARITY(%s, b.Book_Author))
+    )"""
+    return condition, [search_query] * 3, rank, [search_query] * 3
+
+
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", 100))
+CURSOR_NUMERIC_MAX_DIGITS = 1000
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def is_decimal_string(value):
+    """Whether `value` is a string Postgres casts to NUMERIC: finite and well inside its range."""
+    if not isinstance(value, str):
+        return False
+    try:
+        number = Decimal(value)
+    except ArithmeticError:
+        return False
+    return (
+        number.is_finite()
+        and len(number.as_tuple().digits) <= CURSOR_NUMERIC_MAX_DIGITS
+        and abs(number.adjusted()) <= CURSOR_NUMERIC_MAX_DIGITS
+    )
+
+
+# Checks for the cursor value bound to each SQL type, so a tampered cursor is
+# a 400 rather than a failed cast in the database
+CURSOR_VALUE_CHECKS = {
+    'INTEGER': lambda value: isinstance(value, int) and not isinstance(value, bool),
+    'NUMERIC': is_decimal_string,
+    'REAL': is_number,
+    'TEXT': lambda value: isinstance(value, str),
+}
+
+
+def decode_cursor(cursor, sort_types):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != len(sort_types):
+        raise ValueError('Invalid cursor')
+    if not all(CURSOR_VALUE_CHECKS[sort_type](value) for sort_type, value in zip(sort_types, values)):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def page_args(args):
+    """Parse the page and limit arguments of a paginated route; raises ValueError for a 400."""
+    try:
+        page = int(args.get('page', 1))
+        limit = int(args.get('limit', 10))
+    except ValueError:
+        raise ValueError('Invalid page or limit')
+
+    if page < 1 or not 1 <= limit <= PAGE_MAX_LIMIT:
+        raise ValueError(f'page must be at least 1 and limit between 1 and {PAGE_MAX_LIMIT}')
+    return page, limit
+
+
+def arg_flag(name, args=None):
+    args = request.args if args is None else args
+    return args.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+class CountCache:
+    """
+    Bounded LRU cache of catalog search counts keyed by normalized query.
+
+    add_book and delete_book clear it; the TTL bounds staleness for catalog
+    writes made by other backend processes.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = CountCache(
+    max_entries=int(os.getenv("COUNT_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("COUNT_CACHE_TTL", 300)),
+)
+APPROXIMATE_COUNT_THRESHOLD = int(os.getenv("APPROXIMATE_COUNT_THRESHOLD", 10000))
+
+
+def count_cache_key(search_query, search_mode):
+    if search_mode == 'basic':
+        return search_mode, search_query.lower()
+    return search_mode, " ".join(search_query.lower().split())
+
+
+def books_count_query(search_filter):
+    return f"""
+    SELECT 
+        COUNT(*) 
+    FROM 
+        books b
+    WHERE
+        {search_filter};
+    """
+
+
+def books_estimate_query(search_filter):
+    return f"EXPLAIN (FORMAT JSON) SELECT 1 FROM books b WHERE {search_filter};"
+
+
+def planned_rows(plan):
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimate_books(cursor, search_filter, filter_params):
+    cursor.execute(books_estimate_query(search_filter), tuple(filter_params))
+    return planned_rows(cursor.fetchone()[0])
+
+
+def count_books(cursor, search_filter, filter_params, cache_key, approximate=False):
+    """
+    Count the books matching a search filter, serving repeated queries from count_cache.
+
+    With `approximate`, the planner's row estimate is returned instead when it
+    is at least APPROXIMATE_COUNT_THRESHOLD, sparing a full scan for broad
+    queries. Returns (count, is_approximate).
+    """
+    total = count_cache.get(cache_key)
+    if total is not None:
+        return total, False
+
+    if approximate:
+        estimate = estimate_books(cursor, search_filter, filter_params)
+        if estimate >= APPROXIMATE_COUNT_THRESHOLD:
+            return estimate, True
+
+    cursor.execute(books_count_query(search_filter), tuple(filter_params))
+    total = cursor.fetchone()[0]
+
+    count_cache.set(cache_key, total)
+    return total, False
+
+
 @app.route('/total-books', methods=['GET'])
 @token_required
+@conditional_get('catalog')
 def get_total_books(user_id):
     """
     Get the total number of books in the database.
     ---
+    parameters:
+      - name: q
+        in: query
+        required: false
+        description: Search query for book title, author, or ISBN
+        schema:
+          type: string
+      - name: search_mode
+        in: query
+        required: false
+        description: Search mode, either basic (default) or fulltext
+        schema:
+          type: string
+      - name: approximate
+        in: query
+        required: false
+        description: Allow a planner estimate instead of an exact count for very broad queries
+        schema:
+          type: boolean
     responses:
       200:
         description: Total number of books
@@ -61,41 +497,147 @@ def get_total_books(user_id):
             totalBooks:
               type: integer
               example: 100
+            totalIsApproximate:
+              type: boolean
+      400:
+        description: Bad request
       500:
         description: Internal server error
     """
     search_query = request.args.get('q', '')
+    search_mode = request.args.get('search_mode', 'basic')
+
+    if search_mode not in SEARCH_MODES:
+        return jsonify({'error': 'Invalid search mode'}), 400
+
+    search_filter, filter_params, _, _ = build_search_filter(search_query, search_mode)
+    cache_key = count_cache_key(search_query, search_mode)
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        query = """
-        SELECT 
-            COUNT(*) 
-        FROM 
-            books b
-        WHERE
-            b.Book_Title ILIKE %s
-            OR b.Book_Author ILIKE %s
-            OR b.ISBN ILIKE %s;
-        """
-        cursor.execute(query, (
-            f"%{search_query}%",
-            f"%{search_query}%",
-            f"{search_query}"
-        ))
-        total_books = cursor.fetchone()[0]
-
-        conn.close()
-        return jsonify({"totalBooks": total_books}), 200
+            total_books, is_approximate = count_books(
+                cursor, search_filter, filter_params, cache_key, approximate=arg_flag('approximate')
+            )
+
+            return jsonify({"totalBooks": total_books, "totalIsApproximate": is_approximate}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def build_books_page_query(args):
+    """
+    Build the /books page query from its query string arguments.
+
+    Shared by the Flask route and the asyncio server. Returns a dict with the
+    query and its params plus what the caller needs to fill in the total and
+    shape the response. Raises ValueError with the message for a 400.
+    """
+    search_query = args.get('q', '')
+    search_mode = args.get('search_mode', 'basic')
+    page_cursor = args.get('cursor')
+    page, limit = page_args(args)
+    offset = (page - 1) * limit if page_cursor is None else 0
+
+    if search_mode not in SEARCH_MODES:
+        raise ValueError('Invalid search mode')
+
+    search_filter, filter_params, rank, rank_params = build_search_filter(search_query, search_mode)
+
+    sort_columns = ["s.Average_Rating", "s.ISBN"]
+    sort_types = ["NUMERIC", "TEXT"]
+    if rank:
+        sort_columns.insert(0, rank)
+        sort_types.insert(0, "REAL")
+    sort_key = ", ".join(sort_columns)
+
+    keyset_filter = "TRUE"
+    keyset_params = []
+    if page_cursor:
+        cursor_values = decode_cursor(page_cursor, sort_types)
+        placeholders = ", ".join(f"%s::{sort_type}" for sort_type in sort_types)
+        keyset_filter = f"({sort_key}) < ({placeholders})"
+        keyset_params = rank_params + cursor_values
+
+    include_total = arg_flag('include_total', args)
+    approximate_total = arg_flag('approximate_total', args)
+    cache_key = count_cache_key(search_query, search_mode)
+    total = count_cache.get(cache_key) if include_total else None
+    window_total = include_total and total is None and not page_cursor and not approximate_total
+
+    query = f"""
+    SELECT 
+        b.ISBN,
+        b.Book_Title,
+        b.Book_Author,
+        b.Image_URL,
+        s.Average_Rating,
+        i.Price,
+        {rank or 'NULL'} AS Relevance,
+        {'COUNT(*) OVER ()' if window_total else 'NULL'} AS Total
+    FROM 
+        books b
+    JOIN 
+        book_stats s ON b.ISBN = s.ISBN
+    LEFT JOIN 
+        inventory i ON b.ISBN = i.ISBN
+    WHERE
+        {search_filter}
+        AND {keyset_filter}
+    ORDER BY 
+        {", ".join(f"{column} DESC" for column in sort_columns)}
+    LIMIT %s OFFSET %s;
+    """
+
+    return {
+        'query': query,
+        'params': tuple(rank_params + filter_params + keyset_params + rank_params + [limit + 1, offset]),
+        'limit': limit,
+        'ranked': rank is not None,
+        'search_filter': search_filter,
+        'filter_params': filter_params,
+        'cache_key': cache_key,
+        'include_total': include_total,
+        'approximate_total': approximate_total,
+        'window_total': window_total,
+        'total': total
+    }
+
+
+def books_page_response(page, books, total, total_is_approximate):
+    next_cursor = None
+    if len(books) > page['limit']:
+        books = books[:page['limit']]
+        last = books[-1]
+        cursor_values = [str(last[4]), last[0]]
+        if page['ranked']:
+            cursor_values.insert(0, last[6])
+        next_cursor = encode_cursor(cursor_values)
+
+    books_list = [
+        {
+            "ISBN": row[0],
+            "Book_Title": row[1],
+            "Book_Author": row[2],
+            "Image_URL": row[3],
+            "Average_Rating": round(row[4], 2),
+            "Price": float(row[5]) if row[5] is not None else 0.0
+        }
+        for row in books
+    ]
+
+    response = {"books": books_list, "next_cursor": next_cursor}
+    if page['include_total']:
+        response["totalBooks"] = total
+        response["totalIsApproximate"] = total_is_approximate
+    return response
+
+
 @app.route('/books', methods=['GET'])
 @token_required
+@conditional_get('catalog', 'inventory', 'ratings')
 def get_books(user_id):
     """
     Get a list of books based on search query.
@@ -107,6 +649,12 @@ def get_books(user_id):
         description: Search query for book title, author, or ISBN
         schema:
           type: string
+      - name: search_mode
+        in: query
+        required: false
+        description: Search mode, either basic (default) or fulltext ranked by relevance
+        schema:
+          type: string
       - name: page
         in: query
         required: false
@@ -116,15 +664,42 @@ def get_books(user_id):
       - name: limit
         in: query
         required: false
-        description: Number of books per page
+        description: Number of books per page (1 to PAGE_MAX_LIMIT)
         schema:
           type: integer
+      - name: cursor
+        in: query
+        required: false
+        description: Opaque cursor from a previous next_cursor; switches to keyset pagination (empty for the first page)
+        schema:
+          type: string
+      - name: include_total
+        in: query
+        required: false
+        description: Also return the total number of matching books, computed in the same query
+        schema:
+          type: boolean
+      - name: approximate_total
+        in: query
+        required: false
+        description: With include_total, allow a planner estimate for very broad queries
+        schema:
+          type: boolean
     responses:
       200:
         description: List of books
         schema:
           type: object
           properties:
+            next_cursor:
+              type: string
+              description: Cursor for the following page, null on the last page
+            totalBooks:
+              type: integer
+              description: Only present with include_total
+            totalIsApproximate:
+              type: boolean
+              description: Only present with include_total
             books:
               type: array
               items:
@@ -142,72 +717,85 @@ def get_books(user_id):
                     type: number
                   Price:
                     type: number
+      400:
+        description: Bad request
       500:
         description: Internal server error
     """
-    search_query = request.args.get('q', '')
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 10))
-    offset = (page - 1) * limit
+    try:
+        page = build_books_page_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        query = """
-        SELECT 
-            b.ISBN,
-            b.Book_Title,
-            b.Book_Author,
-            b.Image_URL,
-            COALESCE(AVG(r.Book_Rating), 0) AS Average_Rating,
-            i.Price
-        FROM 
-            books b
-        LEFT JOIN 
-            ratings r ON b.ISBN = r.ISBN
-        LEFT JOIN 
-            inventory i ON b.ISBN = i.ISBN
-        WHERE
-            b.Book_Title ILIKE %s
-            OR b.Book_Author ILIKE %s
-            OR b.ISBN ILIKE %s
-        GROUP BY 
-            b.ISBN, i.Price
-        ORDER BY 
-            Average_Rating DESC
-        LIMIT %s OFFSET %s;
-        """
-        cursor.execute(query, (
-            f"%{search_query}%",
-            f"%{search_query}%",
-            f"{search_query}",
-            limit,
-            offset
-        ))
-        books = cursor.fetchall()
-
-        books_list = [
-            {
-                "ISBN": row[0],
-                "Book_Title": row[1],
-                "Book_Author": row[2],
-                "Image_URL": row[3],
-                "Average_Rating": round(row[4], 2),
-                "Price": float(row[5]) if row[5] is not None else 0.0
-            }
-            for row in books
-        ]
+            cursor.execute(page['query'], page['params'])
+            books = cursor.fetchall()
 
-        conn.close()
-        return jsonify({"books": books_list}), 200
+            total, total_is_approximate = page['total'], False
+            if page['window_total'] and books:
+                total = books[0][7]
+                count_cache.set(page['cache_key'], total)
+            elif page['include_total'] and total is None:
+                total, total_is_approximate = count_books(
+                    cursor, page['search_filter'], page['filter_params'], page['cache_key'],
+                    approximate=page['approximate_total']
+                )
+
+            return jsonify(books_page_response(page, books, total, total_is_approximate)), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+BOOKS_BATCH_MAX_ISBNS = int(os.getenv("BOOKS_BATCH_MAX_ISBNS", 300))
+
+
+BOOK_DETAILS_QUERY = """
+SELECT
+    b.ISBN, 
+    b.Book_Title,
+    b.Book_Author,
+    b.Year_Of_Publication,
+    b.Publisher,
+    b.Image_URL,
+    COALESCE(s.Average_Rating, 0) AS Average_Rating,
+    i.Quantity,
+    i.Price,
+    COALESCE(s.Rating_Count, 0) AS Rating_Count,
+    s.Rating_Histogram
+FROM 
+    books b
+LEFT JOIN 
+    book_stats s ON b.ISBN = s.ISBN
+LEFT JOIN 
+    inventory i ON b.ISBN = i.ISBN
+WHERE
+    b.ISBN = %s;
+"""
+
+
+def book_details(row):
+    return {
+        "ISBN": row[0],
+        "Book_Title": row[1],
+        "Book_Author": row[2],
+        "Year_Of_Publication": row[3],
+        "Publisher": row[4],
+        "Image_URL": row[5],
+        "Average_Rating": round(row[6], 2),
+        "Quantity": row[7] if row[7] is not None else 0,
+        "Price": float(row[8]) if row[8] is not None else 0.0,
+        "Rating_Count": row[9],
+        "Rating_Histogram": row[10] if row[10] is not None else [0] * 11
+    }
+
+
 @app.route('/book', methods=['GET'])
 @token_required
+@conditional_get('catalog', 'inventory', 'ratings')
 def get_book(user_id):
     """
     Get book details by ISBN.
@@ -246,6 +834,13 @@ def get_book(user_id):
                   type: integer
                 Price:
                   type: number
+                Rating_Count:
+                  type: integer
+                Rating_Histogram:
+                  type: array
+                  description: Number of ratings for each score from 0 to 10
+                  items:
+                    type: integer
       404:
         description: Book not found
       500:
@@ -254,56 +849,117 @@ def get_book(user_id):
     isbn = request.args.get('isbn', '')
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(BOOK_DETAILS_QUERY, (isbn,))
+            book = cursor.fetchone()
+
+            if book is None:
+                return jsonify({"error": "Book not found"}), 404
+
+            return jsonify({"book": book_details(book)}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        query = """
-        SELECT
-            b.ISBN, 
-            b.Book_Title,
-            b.Book_Author,
-            b.Year_Of_Publication,
-            b.Publisher,
-            b.Image_URL,
-            COALESCE(AVG(r.Book_Rating), 0) AS Average_Rating,
-            i.Quantity,
-            i.Price
-        FROM 
-            books b
-        LEFT JOIN 
-            ratings r ON b.ISBN = r.ISBN
-        LEFT JOIN 
-            inventory i ON b.ISBN = i.ISBN
-        WHERE
-            b.ISBN = %s
-        GROUP BY 
-            b.ISBN, i.Quantity, i.Price;
-        """
-        cursor.execute(query, (isbn,))
-        book = cursor.fetchone()
-
-        if book is None:
-            return jsonify({"error": "Book not found"}), 404
-
-        book_dict = {
-            "ISBN": book[0],
-            "Book_Title": book[1],
-            "Book_Author": book[2],
-            "Year_Of_Publication": book[3],
-            "Publisher": book[4],
-            "Image_URL": book[5],
-            "Average_Rating": round(book[6], 2),
-            "Quantity": book[7] if book[7] is not None else 0,
-            "Price": float(book[8]) if book[8] is not None else 0.0
-        }
 
-        conn.close()
-        return jsonify({"book": book_dict}), 200
+BOOKS_BATCH_QUERY = """
+SELECT
+    b.ISBN, 
+    b.Book_Title,
+    b.Book_Author,
+    b.Year_Of_Publication,
+    b.Publisher,
+    b.Image_URL,
+    COALESCE(s.Average_Rating, 0) AS Average_Rating,
+    i.Quantity,
+    i.Price,
+    COALESCE(s.Rating_Count, 0) AS Rating_Count,
+    s.Rating_Histogram
+FROM
+    UNNEST(%s::TEXT[]) WITH ORDINALITY AS q(ISBN, Position)
+JOIN
+    books b ON b.ISBN = q.ISBN
+LEFT JOIN 
+    book_stats s ON b.ISBN = s.ISBN
+LEFT JOIN 
+    inventory i ON b.ISBN = i.ISBN
+ORDER BY
+    q.Position;
+"""
+
+
+@app.route('/books/batch', methods=['GET'])
+@token_required
+@conditional_get('catalog', 'inventory', 'ratings')
+def get_books_batch(user_id):
+    """
+    Get book details for a list of ISBNs in a single query.
+    ---
+    parameters:
+      - name: isbns
+        in: query
+        required: true
+        description: Comma-separated list of ISBNs (at most BOOKS_BATCH_MAX_ISBNS)
+        schema:
+          type: string
+    responses:
+      200:
+        description: Book details in request order, plus the ISBNs that were not found
+        schema:
+          type: object
+          properties:
+            books:
+              type: array
+              items:
+                type: object
+                description: Same shape as the book returned by /book
+            missing:
+              type: array
+              items:
+                type: string
+      400:
+        description: Bad request
+      500:
+        description: Internal server error
+    """
+    isbns = list(dict.fromkeys(
+        isbn.strip() for isbn in request.args.get('isbns', '').split(',') if isbn.strip()
+    ))
+
+    if not isbns:
+        return jsonify({'error': 'Missing required data'}), 400
+
+    if len(isbns) > BOOKS_BATCH_MAX_ISBNS:
+        return jsonify({'error': f'At most {BOOKS_BATCH_MAX_ISBNS} ISBNs can be requested at once'}), 400
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(BOOKS_BATCH_QUERY, (isbns,))
+            books = [book_details(row) for row in cursor.fetchall()]
+
+            found = {book["ISBN"] for book in books}
+            missing = [isbn for isbn in isbns if isbn not in found]
+
+            return jsonify({"books": books, "missing": missing}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+TOTAL_REVIEWS_QUERY = """
+SELECT
+    COUNT(*)
+FROM
+    ratings
+WHERE
+    User_ID = %s;
+"""
+
+
 @app.route('/total-reviews', methods=['GET'])
 @token_required
 def get_my_total_reviews(user_id):
@@ -323,27 +979,80 @@ def get_my_total_reviews(user_id):
         description: Internal server error
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        query = """
-        SELECT
-            COUNT(*)
-        FROM
-            ratings
-        WHERE
-            User_ID = %s;
-        """
-        cursor.execute(query, (user_id,))
-        total_reviews = cursor.fetchone()[0]
+            cursor.execute(TOTAL_REVIEWS_QUERY, (user_id,))
+            total_reviews = cursor.fetchone()[0]
 
-        conn.close()
-        return jsonify({'totalReviews': total_reviews}), 200
+            return jsonify({'totalReviews': total_reviews}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def build_reviews_page_query(user_id, args):
+    """
+    Build the /reviews page query; returns (query, params, limit).
+
+    Shared by the Flask route and the asyncio server. Raises ValueError with
+    the message for a 400.
+    """
+    page_cursor = args.get('cursor')
+    page, limit = page_args(args)
+    offset = (page - 1) * limit if page_cursor is None else 0
+
+    keyset_filter = "TRUE"
+    keyset_params = []
+    if page_cursor:
+        keyset_params = decode_cursor(page_cursor, ['INTEGER', 'TEXT'])
+        keyset_filter = "(r.Book_Rating, r.ISBN) < (%s::INTEGER, %s::TEXT)"
+
+    query = f"""
+    SELECT
+        b.ISBN,
+        b.Book_Title,
+        b.Book_Author,
+        b.Image_URL,
+        r.Book_Rating,
+        i.Price
+    FROM
+        ratings r
+    JOIN
+        books b ON r.ISBN = b.ISBN
+    LEFT JOIN
+        inventory i ON b.ISBN = i.ISBN
+    WHERE
+        r.User_ID = %s
+        AND {keyset_filter}
+    ORDER BY
+        r.Book_Rating DESC,
+        r.ISBN DESC
+    LIMIT %s OFFSET %s;
+    """
+    return query, tuple([user_id] + keyset_params + [limit + 1, offset]), limit
+
+
+def reviews_page_response(reviews, limit):
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        next_cursor = encode_cursor([reviews[-1][4], reviews[-1][0]])
+
+    reviews_list = [
+        {
+            "ISBN": row[0],
+            "Book_Title": row[1],
+            "Book_Author": row[2],
+            "Image_URL": row[3],
+            "Average_Rating": row[4],
+            "Price": float(row[5]) if row[5] is not None else 0.0
+        }
+        for row in reviews
+    ]
+    return {'reviews': reviews_list, 'next_cursor': next_cursor}
+
+
 @app.route('/reviews', methods=['GET'])
 @token_required
 def get_my_reviews(user_id):
@@ -360,15 +1069,24 @@ def get_my_reviews(user_id):
       - name: limit
         in: query
         required: false
-        description: Number of reviews per page
+        description: Number of reviews per page (1 to PAGE_MAX_LIMIT)
         schema:
           type: integer
+      - name: cursor
+        in: query
+        required: false
+        description: Opaque cursor from a previous next_cursor; switches to keyset pagination (empty for the first page)
+        schema:
+          type: string
     responses:
       200:
         description: List of reviews
         schema:
           type: object
           properties:
+            next_cursor:
+              type: string
+              description: Cursor for the following page, null on the last page
             reviews:
               type: array
               items:
@@ -389,56 +1107,35 @@ def get_my_reviews(user_id):
       500:
         description: Internal server error
     """
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 10))
-    offset = (page - 1) * limit
+    try:
+        query, params, limit = build_reviews_page_query(user_id, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        query = """
-        SELECT
-            b.ISBN,
-            b.Book_Title,
-            b.Book_Author,
-            b.Image_URL,
-            r.Book_Rating,
-            i.Price
-        FROM
-            ratings r
-        JOIN
-            books b ON r.ISBN = b.ISBN
-        LEFT JOIN
-            inventory i ON b.ISBN = i.ISBN
-        WHERE
-            r.User_ID = %s
-        ORDER BY
-            r.Book_Rating DESC
-        LIMIT %s OFFSET %s;
-        """
-        cursor.execute(query, (user_id, limit, offset))
-        reviews = cursor.fetchall()
-
-        reviews_list = [
-            {
-                "ISBN": row[0],
-                "Book_Title": row[1],
-                "Book_Author": row[2],
-                "Image_URL": row[3],
-                "Average_Rating": row[4],
-                "Price": float(row[5]) if row[5] is not None else 0.0
-            }
-            for row in reviews
-        ]
+            cursor.execute(query, params)
+            reviews = cursor.fetchall()
 
-        conn.close()
-        return jsonify({'reviews': reviews_list}), 200
+            return jsonify(reviews_page_response(reviews, limit)), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+REVIEW_STATUS_QUERY = """
+SELECT
+    Book_Rating
+FROM
+    ratings
+WHERE
+    User_ID = %s
+    AND ISBN = %s;
+"""
+
+
 @app.route('/book/review/status', methods=['GET'])
 @token_required
 def get_review_status(user_id):
@@ -471,23 +1168,13 @@ def get_review_status(user_id):
         return jsonify({'error': 'Missing required data'}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        query = """
-        SELECT
-            Book_Rating
-        FROM
-            ratings
-        WHERE
-            User_ID = %s
-            AND ISBN = %s;
-        """
-        cursor.execute(query, (user_id, isbn))
-        book_rating = cursor.fetchone()
+            cursor.execute(REVIEW_STATUS_QUERY, (user_id, isbn))
+            book_rating = cursor.fetchone()
 
-        conn.close()
-        return jsonify({'bookRating': book_rating}), 200
+            return jsonify({'bookRating': book_rating}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -528,20 +1215,31 @@ def add_book_review(user_id):
     rating = int(data.get('rating'))
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            query = """
+            INSERT INTO 
+                ratings (User_ID, ISBN, Book_Rating)
+            VALUES 
+                (%s, %s, %s);
+            """
+            cursor.execute(query, (user_id, isbn, rating))
+
+            histogram = [1 if score == rating else 0 for score in range(11)]
+            cursor.execute("""
+                INSERT INTO book_stats (ISBN, Rating_Count, Rating_Sum, Rating_Histogram)
+                VALUES (%s, 1, %s, %s)
+                ON CONFLICT (ISBN) DO UPDATE
+                SET Rating_Count = book_stats.Rating_Count + 1,
+                    Rating_Sum = book_stats.Rating_Sum + EXCLUDED.Rating_Sum,
+                    Rating_Histogram[%s] = book_stats.Rating_Histogram[%s] + 1;
+            """, (isbn, rating, histogram, rating + 1, rating + 1))
 
-        query = """
-        INSERT INTO 
-            ratings (User_ID, ISBN, Book_Rating)
-        VALUES 
-            (%s, %s, %s);
-        """
-        cursor.execute(query, (user_id, isbn, rating))
-        conn.commit()
+            bump_data_versions(cursor, 'ratings')
+            conn.commit()
 
-        conn.close()
-        return jsonify({"message": "Review added successfully"}), 200
+            return jsonify({"message": "Review added successfully"}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -575,19 +1273,18 @@ def add_to_cart(user_id):
     isbn = data.get('isbn')
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        insert_query = """
-        INSERT INTO cart_items (User_ID, ISBN)
-        VALUES (%s, %s);
-        """
-        cursor.execute(insert_query, (user_id, isbn))
+            insert_query = """
+            INSERT INTO cart_items (User_ID, ISBN)
+            VALUES (%s, %s);
+            """
+            cursor.execute(insert_query, (user_id, isbn))
 
-        conn.commit()
-        conn.close()
+            conn.commit()
 
-        return jsonify({'message': 'Book added to cart'}), 200
+            return jsonify({'message': 'Book added to cart'}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -621,24 +1318,33 @@ def remove_from_cart(user_id):
     isbn = data.get('isbn')
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        delete_query = """
-        DELETE FROM cart_items
-        WHERE User_ID = %s AND ISBN = %s;
-        """
-        cursor.execute(delete_query, (user_id, isbn))
+            delete_query = """
+            DELETE FROM cart_items
+            WHERE User_ID = %s AND ISBN = %s;
+            """
+            cursor.execute(delete_query, (user_id, isbn))
 
-        conn.commit()
-        conn.close()
+            conn.commit()
 
-        return jsonify({'message': 'Book removed from cart'}), 200
+            return jsonify({'message': 'Book removed from cart'}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+TOTAL_CART_QUERY = """
+SELECT
+    COUNT(*)
+FROM
+    cart_items
+WHERE
+    User_ID = %s;
+"""
+
+
 @app.route('/total-cart', methods=['GET'])
 @token_required
 def get_total_cart(user_id):
@@ -658,27 +1364,67 @@ def get_total_cart(user_id):
         description: Internal server error
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        query = """
-        SELECT
-            COUNT(*)
-        FROM
-            cart_items
-        WHERE
-            User_ID = %s;
-        """
-        cursor.execute(query, (user_id,))
-        total_books = cursor.fetchone()[0]
+            cursor.execute(TOTAL_CART_QUERY, (user_id,))
+            total_books = cursor.fetchone()[0]
 
-        conn.close()
-        return jsonify({'totalBooksCart': total_books}), 200
+            return jsonify({'totalBooksCart': total_books}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def build_cart_query(user_id, args):
+    """
+    Build the GET /cart query; returns (query, params).
+
+    The whole cart is returned unless both page and limit are given.
+    """
+    page = args.get('page')
+    limit = args.get('limit')
+
+    query = """
+    SELECT
+        b.ISBN,
+        b.Book_Title,
+        b.Book_Author,
+        b.Image_URL,
+        COALESCE(s.Average_Rating, 0) AS Average_Rating,
+        i.Price
+    FROM
+        cart_items c
+    JOIN
+        books b ON c.ISBN = b.ISBN
+    LEFT JOIN
+        book_stats s ON b.ISBN = s.ISBN
+    LEFT JOIN
+        inventory i ON b.ISBN = i.ISBN
+    WHERE
+        c.User_ID = %s
+    """
+
+    params = [user_id]
+    if page and limit:
+        offset = (int(page) - 1) * int(limit)
+        query += " LIMIT %s OFFSET %s"
+        params += [int(limit), offset]
+
+    return query, tuple(params)
+
+
+def cart_book(row):
+    return {
+        "ISBN": row[0],
+        "Book_Title": row[1],
+        "Book_Author": row[2],
+        "Image_URL": row[3],
+        "Average_Rating": round(row[4], 2),
+        "Price": float(row[5]) if row[5] is not None else 0.0
+    }
+
+
 @app.route('/cart', methods=['GET'])
 @token_required
 def get_books_cart(user_id):
@@ -695,7 +1441,7 @@ def get_books_cart(user_id):
       - name: limit
         in: query
         required: false
-        description: Number of books per page
+        description: Number of books per page (1 to PAGE_MAX_LIMIT)
         schema:
           type: integer
     responses:
@@ -724,65 +1470,156 @@ def get_books_cart(user_id):
       500:
         description: Internal server error
     """
-    page = request.args.get('page')
-    limit = request.args.get('limit')
-
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        query, params = build_cart_query(user_id, request.args)
 
-        query = """
-        SELECT
-            b.ISBN,
-            b.Book_Title,
-            b.Book_Author,
-            b.Image_URL,
-            COALESCE(AVG(r.Book_Rating), 0) AS Average_Rating,
-            i.Price
-        FROM
-            cart_items c
-        JOIN
-            books b ON c.ISBN = b.ISBN
-        LEFT JOIN
-            ratings r ON b.ISBN = r.ISBN
-        LEFT JOIN
-            inventory i ON b.ISBN = i.ISBN
-        WHERE
-            c.User_ID = %s
-        GROUP BY 
-            b.ISBN, b.Book_Title, b.Book_Author, b.Image_URL, i.Price
-        """
-
-        params = [user_id]
-        if page and limit:
-            offset = (int(page) - 1) * int(limit)
-            query += " LIMIT %s OFFSET %s"
-            params += [int(limit), offset]
-
-        cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        books = [{
-            "ISBN": row[0],
-            "Book_Title": row[1],
-            "Book_Author": row[2],
-            "Image_URL": row[3],
-            "Average_Rating": round(row[4], 2),
-            "Price": float(row[5]) if row[5] is not None else 0.0
-        } for row in rows]
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
 
-        conn.close()
-        return jsonify({'booksCart': books}), 200
+            return jsonify({'booksCart': [cart_book(row) for row in rows]}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+class OrderError(Exception):
+    pass
+
+
+ORDER_STOCK_LOCK_QUERY = """
+SELECT ISBN, Quantity
+FROM inventory
+WHERE ISBN = ANY(%s)
+ORDER BY ISBN
+FOR UPDATE;
+"""
+
+
+CREATE_ORDER_QUERY = """
+WITH new_order AS (
+    INSERT INTO orders (Order_ID, User_ID, Address)
+    VALUES (COALESCE(%(order_id)s, NEXTVAL('orders_order_id_seq')), %(user_id)s, %(address)s)
+    RETURNING Order_ID, Order_Date
+), order_lines AS (
+    INSERT INTO order_items (Order_ID, ISBN, Quantity, Unit_Price)
+    SELECT new_order.Order_ID, q.ISBN, q.Requested, i.Price
+    FROM new_order,
+         UNNEST(%(isbns)s::TEXT[], %(quantities)s::INTEGER[]) AS q(ISBN, Requested)
+         JOIN inventory i ON i.ISBN = q.ISBN
+    RETURNING Quantity, Unit_Price
+), stock_update AS (
+    UPDATE inventory i
+    SET Quantity = i.Quantity - q.Requested
+    FROM UNNEST(%(isbns)s::TEXT[], %(quantities)s::INTEGER[]) AS q(ISBN, Requested)
+    WHERE i.ISBN = q.ISBN
+), cart_cleanup AS (
+    DELETE FROM cart_items
+    WHERE User_ID = %(user_id)s AND ISBN = ANY(%(isbns)s)
+), monthly_stats AS (
+    INSERT INTO order_stats_monthly (Month, Order_Count, Items_Sold, Revenue)
+    SELECT DATE_TRUNC('month', new_order.Order_Date)::DATE, 1, SUM(order_lines.Quantity),
+           COALESCE(SUM(order_lines.Quantity * order_lines.Unit_Price), 0)
+    FROM new_order, order_lines
+    GROUP BY new_order.Order_Date
+    ON CONFLICT (Month) DO UPDATE
+    SET Order_Count = order_stats_monthly.Order_Count + EXCLUDED.Order_Count,
+        Items_Sold = order_stats_monthly.Items_Sold + EXCLUDED.Items_Sold,
+        Revenue = order_stats_monthly.Revenue + EXCLUDED.Revenue
+), version_bump AS (
+    UPDATE data_versions
+    SET Version = Version + 1
+    WHERE Name IN ('inventory', 'orders')
+)
+SELECT Order_ID FROM new_order;
+"""
+
+
+def create_order(cursor, user_id, address, items, order_id=None):
+    """
+    Place an order for `items`, (isbn, quantity) pairs, inside the caller's transaction and return its Order_ID.
+
+    `order_id` lets the order worker use the id reserved when the order was queued.
+
+    The inventory rows are locked in ISBN order before the stock check so
+    concurrent checkouts serialize instead of overselling, then the order,
+    its lines with their quantity and current unit price, the stock decrement and the cart cleanup are written by a
+    single statement, which also adds the order to its month in
+    order_stats_monthly and bumps the inventory and orders data versions.
+    Raises OrderError when a book is unknown or out of stock.
+    """
+    requested = {}
+    for isbn, quantity in items:
+        requested[isbn] = requested.get(isbn, 0) + quantity
+    order_isbns = sorted(requested)
+    quantities = [requested[isbn] for isbn in order_isbns]
+
+    cursor.execute(ORDER_STOCK_LOCK_QUERY, (order_isbns,))
+    stock = dict(cursor.fetchall())
+
+    for isbn in order_isbns:
+        if isbn not in stock:
+            raise OrderError(f'Cartea cu ISBN {isbn} nu există în stoc.')
+        if stock[isbn] is None or stock[isbn] < requested[isbn]:
+            raise OrderError(f'Stoc insuficient pentru cartea cu ISBN {isbn}.')
+
+    cursor.execute(CREATE_ORDER_QUERY, {
+        'order_id': order_id,
+        'user_id': user_id,
+        'address': address,
+        'isbns': order_isbns,
+        'quantities': quantities
+    })
+    return cursor.fetchone()[0]
+
+
+ORDER_INTAKE_MODE = os.getenv("ORDER_INTAKE_MODE", "sync")
+ORDER_ITEM_MAX_QUANTITY = int(os.getenv("ORDER_ITEM_MAX_QUANTITY", 100))
+
+
+def valid_order_item(item):
+    if not isinstance(item, dict):
+        return False
+    isbn = item.get('isbn')
+    quantity = item.get('quantity', 1)
+    return (
+        isinstance(isbn, str) and bool(isbn.strip())
+        and isinstance(quantity, int) and not isinstance(quantity, bool)
+        and 1 <= quantity <= ORDER_ITEM_MAX_QUANTITY
+    )
+
+
+def enqueue_order(cursor, user_id, address, items, idempotency_key):
+    """
+    Durably queue an order for the order worker and return (Order_ID, Status).
+
+    The Order_ID is reserved from the orders sequence up front. Repeating a
+    request with the same idempotency key returns the originally queued order.
+    """
+    cursor.execute("""
+        INSERT INTO order_queue (Order_ID, User_ID, Idempotency_Key, Address, Items)
+        VALUES (NEXTVAL('orders_order_id_seq'), %s, %s, %s, %s)
+        ON CONFLICT (User_ID, Idempotency_Key) DO UPDATE
+        SET Idempotency_Key = EXCLUDED.Idempotency_Key
+        RETURNING Order_ID, Status;
+    """, (user_id, idempotency_key, address, json.dumps(items)))
+    queued = cursor.fetchone()
+
+    cursor.execute("NOTIFY order_queue;")
+    return queued
+
+
 @app.route('/order', methods=['POST'])
 @token_required
 def place_order(user_id):
     """
     Place an order for the books in the cart.
+
+    Orders are placed synchronously unless ORDER_INTAKE_MODE is async or the
+    request sends "Prefer: respond-async", in which case the order is queued
+    for the order worker and 202 is returned with the reserved order id.
     ---
     parameters:
       - name: address
@@ -802,9 +1639,20 @@ def place_order(user_id):
             properties:
               isbn:
                 type: string
+              quantity:
+                type: integer
+                description: Copies to order, 1 to ORDER_ITEM_MAX_QUANTITY (default 1)
+      - name: Idempotency-Key
+        in: header
+        required: false
+        description: Key identifying a queued order, so retries do not queue it twice
+        schema:
+          type: string
     responses:
       200:
         description: Order placed successfully
+      202:
+        description: Order queued for fulfilment
       400:
         description: Bad request
       500:
@@ -818,54 +1666,108 @@ def place_order(user_id):
     if not user_id or not address or not items:
         return jsonify({'error': 'Missing required data'}), 400
 
+    if not isinstance(items, list) or not all(valid_order_item(item) for item in items):
+        return jsonify({'error': 'Invalid items'}), 400
+
+    order_items = [(item['isbn'], item.get('quantity', 1)) for item in items]
+    queue_order = ORDER_INTAKE_MODE == 'async' or 'respond-async' in request.headers.get('Prefer', '')
+
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        for item in items:
-            isbn = item['isbn']
-            cursor.execute("""
-                SELECT Quantity FROM inventory WHERE ISBN = %s;
-            """, (isbn,))
-            result = cursor.fetchone()
+            if queue_order:
+                idempotency_key = request.headers.get('Idempotency-Key') or uuid.uuid4().hex
+                order_id, status = enqueue_order(cursor, user_id, address, order_items, idempotency_key)
+                conn.commit()
 
-            if not result:
-                return jsonify({'error': f'Cartea cu ISBN {isbn} nu există în stoc.'}), 400
+                return jsonify({'message': 'Order queued', 'orderId': order_id, 'status': status}), 202
 
-        cursor.execute("""
-            INSERT INTO orders (User_ID, Address)
-            VALUES (%s, %s)
-            RETURNING Order_ID;
-        """, (user_id, address))
-        order_id = cursor.fetchone()[0]
+            try:
+                order_id = create_order(cursor, user_id, address, order_items)
+            except OrderError as e:
+                conn.rollback()
+                return jsonify({'error': str(e)}), 400
 
-        for item in items:
-            isbn = item['isbn']
-            cursor.execute("""
-                INSERT INTO order_items (Order_ID, ISBN)
-                VALUES (%s, %s);
-            """, (order_id, isbn))
+            conn.commit()
 
-            cursor.execute("""
-                UPDATE inventory
-                SET Quantity = Quantity - %s
-                WHERE ISBN = %s;
-            """, (1, isbn))
+            return jsonify({'message': 'Order placed successfully!', 'orderId': order_id}), 200
 
-            cursor.execute("""
-                DELETE FROM cart_items
-                WHERE User_ID = %s AND ISBN = %s;
-            """, (user_id, isbn))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        conn.commit()
-        conn.close()
 
-        return jsonify({'message': 'Order placed successfully!'}), 200
+ORDER_STATUS_QUERY = """
+SELECT q.Status, q.Error
+FROM order_queue q
+WHERE q.Order_ID = %s AND q.User_ID = %s
+UNION ALL
+SELECT 'completed', NULL
+FROM orders o
+WHERE o.Order_ID = %s AND o.User_ID = %s
+LIMIT 1;
+"""
+
+
+@app.route('/order/status', methods=['GET'])
+@token_required
+def get_order_status(user_id):
+    """
+    Get the fulfilment status of an order.
+    ---
+    parameters:
+      - name: id
+        in: query
+        required: true
+        description: Order id returned by /order
+        schema:
+          type: integer
+    responses:
+      200:
+        description: Order status
+        schema:
+          type: object
+          properties:
+            orderId:
+              type: integer
+            status:
+              type: string
+              enum: [pending, completed, rejected]
+            error:
+              type: string
+      400:
+        description: Bad request
+      404:
+        description: Order not found
+      500:
+        description: Internal server error
+    """
+    order_id = request.args.get('id', type=int)
+
+    if not order_id:
+        return jsonify({'error': 'Missing required data'}), 400
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(ORDER_STATUS_QUERY, (order_id, user_id, order_id, user_id))
+            result = cursor.fetchone()
+
+            if result is None:
+                return jsonify({'error': 'Order not found'}), 404
+
+            return jsonify({'orderId': order_id, 'status': result[0], 'error': result[1]}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+CART_CHECK_QUERY = """
+SELECT 1 FROM cart_items WHERE User_ID = %s AND ISBN = %s
+"""
+
+
 @app.route('/cart/check', methods=['GET'])
 @token_required
 def check_if_in_cart(user_id):
@@ -898,13 +1800,10 @@ def check_if_in_cart(user_id):
     if not isbn:
         return jsonify({'error': 'Missing required data'}), 400
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT 1 FROM cart_items WHERE User_ID = %s AND ISBN = %s
-    """, (user_id, isbn))
-    result = cursor.fetchone()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(CART_CHECK_QUERY, (user_id, isbn))
+        result = cursor.fetchone()
 
     return jsonify({'inCart': bool(result)})
 
@@ -951,27 +1850,148 @@ def update_book(user_id):
     quantity = data.get('quantity')
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        if price is not None:
-            cursor.execute("""
-                UPDATE inventory
-                SET Price = %s
-                WHERE ISBN = %s;
-            """, (price, isbn))
+            update_inventory(cursor, [(isbn, price, quantity)])
 
-        if quantity is not None:
-            cursor.execute("""
-                UPDATE inventory
-                SET Quantity = %s
-                WHERE ISBN = %s;
-            """, (quantity, isbn))
+            bump_data_versions(cursor, 'inventory')
+            conn.commit()
 
-        conn.commit()
-        conn.close()
+            return jsonify({'message': 'Book updated successfully'}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+INVENTORY_UPDATE_BATCH_SIZE = int(os.getenv("INVENTORY_UPDATE_BATCH_SIZE", 5000))
+
+
+UPDATE_INVENTORY_QUERY = """
+WITH changes AS (
+    SELECT *
+    FROM UNNEST(%s::TEXT[], %s::NUMERIC[], %s::INTEGER[]) AS c(ISBN, Price, Quantity)
+), locked AS (
+    SELECT i.ISBN
+    FROM inventory i
+    JOIN changes c ON c.ISBN = i.ISBN
+    ORDER BY i.ISBN
+    FOR UPDATE OF i
+), updated AS (
+    UPDATE inventory i
+    SET Price = COALESCE(c.Price, i.Price),
+        Quantity = COALESCE(c.Quantity, i.Quantity)
+    FROM changes c
+    JOIN locked l ON l.ISBN = c.ISBN
+    WHERE i.ISBN = c.ISBN
+    RETURNING i.ISBN
+)
+SELECT c.ISBN
+FROM changes c
+WHERE NOT EXISTS (SELECT 1 FROM updated u WHERE u.ISBN = c.ISBN);
+"""
+
+
+def update_inventory(cursor, changes):
+    """
+    Apply (isbn, price, quantity) changes in one statement and return the ISBNs not in inventory.
+
+    A price or quantity of None keeps the current value. The rows are locked
+    in ISBN order, as create_order does, so a bulk update and a checkout
+    touching the same books cannot deadlock.
+    """
+    cursor.execute(UPDATE_INVENTORY_QUERY, (
+        [change[0] for change in changes],
+        [change[1] for change in changes],
+        [change[2] for change in changes]
+    ))
+    return [row[0] for row in cursor.fetchall()]
+
+
+@app.route('/admin/inventory', methods=['PUT'])
+@token_required
+def bulk_update_inventory(user_id):
+    """
+    Update the price and stock of many books at once.
+
+    Changes are applied in batches of INVENTORY_UPDATE_BATCH_SIZE, one
+    statement and one commit per batch. When an ISBN appears more than once
+    the last change wins.
+    ---
+    parameters:
+      - name: items
+        in: body
+        required: true
+        description: Inventory changes; price and quantity are optional
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              isbn:
+                type: string
+              price:
+                type: number
+              quantity:
+                type: integer
+    responses:
+      200:
+        description: Inventory updated successfully
+        schema:
+          type: object
+          properties:
+            updated:
+              type: integer
+            unknown:
+              type: array
+              items:
+                type: string
+      400:
+        description: Bad request
+      500:
+        description: Internal server error
+    """
+    data = request.json
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Missing required data'}), 400
+
+    changes = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('isbn'), str) or not item['isbn'].strip():
+            return jsonify({'error': f'Item {index} has no ISBN'}), 400
 
-        return jsonify({'message': 'Book updated successfully'}), 200
+        price = item.get('price')
+        quantity = item.get('quantity')
+        if price is not None and (not is_number(price) or price < 0):
+            return jsonify({'error': f'Item {index} has an invalid price'}), 400
+        if quantity is not None and (isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 0):
+            return jsonify({'error': f'Item {index} has an invalid quantity'}), 400
+
+        isbn = item['isbn'].strip()
+        changes.pop(isbn, None)
+        changes[isbn] = (isbn, price, quantity)
+
+    changes = list(changes.values())
+    unknown = []
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            for start in range(0, len(changes), INVENTORY_UPDATE_BATCH_SIZE):
+                unknown.extend(update_inventory(cursor, changes[start:start + INVENTORY_UPDATE_BATCH_SIZE]))
+                bump_data_versions(cursor, 'inventory')
+                conn.commit()
+
+            return jsonify({
+                'message': 'Inventory updated successfully',
+                'updated': len(changes) - len(unknown),
+                'unknown': unknown
+            }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1004,18 +2024,19 @@ def delete_book(user_id):
         return jsonify({'error': 'Missing required data'}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute("""
-            DELETE FROM books
-            WHERE ISBN = %s;
-        """, (isbn,))
+            cursor.execute("""
+                DELETE FROM books
+                WHERE ISBN = %s;
+            """, (isbn,))
 
-        conn.commit()
-        conn.close()
+            bump_data_versions(cursor, 'catalog', 'inventory', 'ratings', 'orders')
+            conn.commit()
+            count_cache.clear()
 
-        return jsonify({'message': 'Book deleted successfully'}), 200
+            return jsonify({'message': 'Book deleted successfully'}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1098,108 +2119,751 @@ def add_book(user_id):
     quantity = data.get('quantity')
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute("""
-            INSERT INTO books (ISBN, Book_Title, Book_Author, Year_Of_Publication, Publisher, Image_URL)
-            VALUES (%s, %s, %s, %s, %s, %s);
-        """, (isbn, title, author, year, publisher, image))
+            cursor.execute("""
+                INSERT INTO books (ISBN, Book_Title, Book_Author, Year_Of_Publication, Publisher, Image_URL)
+                VALUES (%s, %s, %s, %s, %s, %s);
+            """, (isbn, title, author, year, publisher, image))
 
-        cursor.execute("""
-            INSERT INTO inventory (ISBN, Price, Quantity)
-            VALUES (%s, %s, %s);
-        """, (isbn, price, quantity))
+            cursor.execute("""
+                INSERT INTO inventory (ISBN, Price, Quantity)
+                VALUES (%s, %s, %s);
+            """, (isbn, price, quantity))
 
-        conn.commit()
-        conn.close()
+            bump_data_versions(cursor, 'catalog', 'inventory')
+            conn.commit()
+            count_cache.clear()
 
-        return jsonify({'message': 'Book added successfully'}), 200
+            return jsonify({'message': 'Book added successfully'}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/stats/orders-per-month', methods=['GET'])
+IMPORT_COLUMNS = (
+    'ISBN', 'Book_Title', 'Book_Author', 'Year_Of_Publication', 'Publisher', 'Image_URL', 'Quantity', 'Price'
+)
+IMPORT_COLUMN_ALIASES = {
+    'isbn': 'ISBN',
+    'book_title': 'Book_Title',
+    'title': 'Book_Title',
+    'book_author': 'Book_Author',
+    'author': 'Book_Author',
+    'year_of_publication': 'Year_Of_Publication',
+    'year': 'Year_Of_Publication',
+    'publisher': 'Publisher',
+    'image_url': 'Image_URL',
+    'image_url_l': 'Image_URL',
+    'image': 'Image_URL',
+    'quantity': 'Quantity',
+    'price': 'Price',
+}
+IMPORT_MAX_REJECTS = int(os.getenv("IMPORT_MAX_REJECTS", 1000))
+
+
+def import_column(name):
+    return IMPORT_COLUMN_ALIASES.get(re.sub(r'[\s-]+', '_', name.strip().lower()))
+
+
+class CopyStream:
+    """
+    Read-only file object that serves rows to cursor.copy_expert as CSV.
+
+    Rows are pulled from the iterator only as COPY asks for more data, so an
+    upload is never held in memory as a whole.
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._pending = ''
+
+    def read(self, size=-1):
+        chunks = [self._pending]
+        length = len(self._pending)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._writer.writerow(row)
+            chunk = self._buffer.getvalue()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+            chunks.append(chunk)
+            length += len(chunk)
+
+        data = "".join(chunks)
+        if size < 0:
+            self._pending = ''
+            return data
+        self._pending = data[size:]
+        return data[:size]
+
+
+def rejected_import_row(line_number, error):
+    return [line_number] + [None] * len(IMPORT_COLUMNS) + [error]
+
+
+def invalid_text_error(values):
+    """
+    The reject reason for values COPY could not load: bytes that were not
+    UTF-8 (replaced with U+FFFD when decoding the upload) or NUL characters.
+    """
+    for value in values:
+        if value and '\ufffd' in value:
+            return 'Invalid UTF-8'
+        if value and '\x00' in value:
+            return 'NUL character'
+    return None
+
+
+def csv_import_rows(stream):
+    """
+    Parse a CSV upload with a books.csv style header into staging rows.
+
+    Returns an iterator of [line number, *IMPORT_COLUMNS, error] rows, where
+    error is set for lines that could not be parsed. Raises ValueError for an
+    unknown or duplicated header column.
+    """
+    reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline=''))
+    try:
+        header = next(reader, None)
+    except csv.Error as e:
+        raise ValueError(f'Invalid header: {e}')
+    if not header:
+        raise ValueError('The upload is empty')
+
+    positions = []
+    for name in header:
+        column = import_column(name)
+        if column is None:
+            raise ValueError(f'Unknown column: {name}')
+        if column in positions:
+            raise ValueError(f'Duplicate column: {name}')
+        positions.append(column)
+    if 'ISBN' not in positions:
+        raise ValueError('Missing column: ISBN')
+
+    indexes = [positions.index(column) if column in positions else None for column in IMPORT_COLUMNS]
+
+    def rows():
+        while True:
+            try:
+                fields = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield rejected_import_row(reader.line_num, f'Invalid CSV: {e}')
+                continue
+
+            if not any(field.strip() for field in fields):
+                continue
+            if len(fields) != len(positions):
+                yield rejected_import_row(reader.line_num, f'Expected {len(positions)} fields, got {len(fields)}')
+                continue
+            error = invalid_text_error(fields)
+            if error:
+                yield rejected_import_row(reader.line_num, error)
+                continue
+            yield [reader.line_num] + [fields[i] if i is not None else None for i in indexes] + [None]
+
+    return rows()
+
+
+def ndjson_import_rows(stream):
+    """
+    Parse an NDJSON upload, one book object per line, into staging rows.
+
+    Keys follow the CSV column names. Lines that are not JSON objects or that
+    carry unknown keys are returned as rejected rows.
+    """
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8', errors='replace'), start=1):
+        if not line.strip():
+            continue
+
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield rejected_import_row(line_number, 'Invalid JSON')
+            continue
+        if not isinstance(item, dict):
+            yield rejected_import_row(line_number, 'Expected a JSON object')
+            continue
+
+        values = {}
+        unknown = [key for key in item if import_column(key) is None]
+        if unknown:
+            yield rejected_import_row(line_number, f'Unknown field: {unknown[0]}')
+            continue
+        for key, value in item.items():
+            values[import_column(key)] = value if value is None or isinstance(value, str) else json.dumps(value)
+        error = invalid_text_error(values.values())
+        if error:
+            yield rejected_import_row(line_number, error)
+            continue
+
+        yield [line_number] + [values.get(column) for column in IMPORT_COLUMNS] + [None]
+
+
+BOOK_IMPORT_TABLE_QUERY = """
+CREATE TEMP TABLE book_import
+(
+    Line_Number         BIGINT,
+    ISBN                TEXT,
+    Book_Title          TEXT,
+    Book_Author         TEXT,
+    Year_Of_Publication TEXT,
+    Publisher           TEXT,
+    Image_URL           TEXT,
+    Quantity            TEXT,
+    Price               TEXT,
+    Error               TEXT
+) ON COMMIT DROP;
+"""
+
+
+IMPORT_BOOKS_MERGE_QUERY = """
+WITH merged AS (
+    INSERT INTO books (ISBN, Book_Title, Book_Author, Year_Of_Publication, Publisher, Image_URL)
+    SELECT ISBN, NULLIF(Book_Title, ''), NULLIF(Book_Author, ''),
+           NULLIF(TRIM(Year_Of_Publication), '')::INTEGER, NULLIF(Publisher, ''),
+           NULLIF(Image_URL, '')
+    FROM book_import
+    WHERE Error IS NULL
+    ON CONFLICT (ISBN) DO UPDATE
+    SET Book_Title = COALESCE(EXCLUDED.Book_Title, books.Book_Title),
+        Book_Author = COALESCE(EXCLUDED.Book_Author, books.Book_Author),
+        Year_Of_Publication = COALESCE(EXCLUDED.Year_Of_Publication, books.Year_Of_Publication),
+        Publisher = COALESCE(EXCLUDED.Publisher, books.Publisher),
+        Image_URL = COALESCE(EXCLUDED.Image_URL, books.Image_URL)
+    RETURNING xmax = 0 AS Inserted
+)
+SELECT COUNT(*) FILTER (WHERE Inserted), COUNT(*) FILTER (WHERE NOT Inserted)
+FROM merged;
+"""
+
+
+IMPORT_INVENTORY_MERGE_QUERY = """
+INSERT INTO inventory (ISBN, Quantity, Price)
+SELECT ISBN, NULLIF(TRIM(Quantity), '')::INTEGER, NULLIF(TRIM(Price), '')::NUMERIC
+FROM book_import
+WHERE Error IS NULL
+ON CONFLICT (ISBN) DO UPDATE
+SET Quantity = COALESCE(EXCLUDED.Quantity, inventory.Quantity),
+    Price = COALESCE(EXCLUDED.Price, inventory.Price);
+"""
+
+
+@app.route('/admin/books/import', methods=['POST'])
 @token_required
-def orders_per_month(user_id):
+def import_books(user_id):
     """
-    Get the number of orders placed per month.
+    Import or update books and their inventory from a streamed CSV or NDJSON upload.
+
+    The body is streamed through COPY into a staging table and merged into
+    books and inventory, so a whole publisher feed loads in one request.
+    Existing books are updated; a column left empty keeps its current value.
+    A book with no inventory yet needs both Quantity and Price: a line that
+    leaves either empty is rejected with "Quantity and Price required for new
+    books" rather than creating an unpriced, unorderable inventory row.
     ---
+    consumes:
+      - text/csv
+      - application/x-ndjson
     parameters:
-      - name: year
-        in: query
-        required: false
-        description: Year to filter orders
+      - name: body
+        in: body
+        required: true
+        description: CSV with a books.csv style header (ISBN, Book-Title, Book-Author, Year-Of-Publication, Publisher, Image-URL-L) plus Quantity and Price columns, or NDJSON objects with the same keys
         schema:
-          type: integer
+          type: string
     responses:
       200:
-        description: List of orders per month
+        description: Import summary with the rejected lines
         schema:
           type: object
           properties:
-            data:
+            inserted:
+              type: integer
+            updated:
+              type: integer
+            rejected:
+              type: integer
+            rejects:
               type: array
               items:
                 type: object
                 properties:
-                  month:
-                    type: string
-                  orderCount:
+                  line:
                     type: integer
-      500:
-        description: Internal server error
+                  error:
+                    type: string
       400:
         description: Bad request
+      500:
+        description: Internal server error
     """
-    year = request.args.get('year')
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json'):
+            rows = ndjson_import_rows(request.stream)
+        else:
+            rows = csv_import_rows(request.stream)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(BOOK_IMPORT_TABLE_QUERY)
+
+            try:
+                cursor.copy_expert(f"""
+                    COPY book_import (Line_Number, {", ".join(IMPORT_COLUMNS)}, Error)
+                    FROM STDIN WITH (FORMAT csv);
+                """, CopyStream(rows))
+            except psycopg2.errors.QueryCanceled as e:
+                # psycopg2 reports an error raised while reading the upload
+                # (e.g. a client disconnect) as a canceled COPY
+                conn.rollback()
+                return jsonify({'error': f'Invalid upload: {e.diag.message_primary}'}), 400
+
+            cursor.execute(r"""
+                UPDATE book_import
+                SET ISBN = TRIM(ISBN),
+                    Error = COALESCE(Error, CASE
+                        WHEN NULLIF(TRIM(ISBN), '') IS NULL THEN 'Missing ISBN'
+                        WHEN NULLIF(TRIM(Year_Of_Publication), '') !~ '^-?\d{1,4}$' THEN 'Invalid year'
+                        WHEN NULLIF(TRIM(Quantity), '') !~ '^\d{1,9}$' THEN 'Invalid quantity'
+                        WHEN NULLIF(TRIM(Price), '') !~ '^\d{1,12}(\.\d+)?$' THEN 'Invalid price'
+                    END);
+            """)
 
-        if year:
             cursor.execute("""
-                SELECT DATE_TRUNC('month', Order_Date) as Month, COUNT(*) as OrderCount
-                FROM orders
-                WHERE EXTRACT(YEAR FROM Order_Date) = %s
-                GROUP BY Month
-                ORDER BY Month;
-            """, (year,))
-        else:
+                UPDATE book_import s
+                SET Error = 'Duplicate ISBN, superseded by a later line'
+                FROM (
+                    SELECT Line_Number, ROW_NUMBER() OVER (PARTITION BY ISBN ORDER BY Line_Number DESC) AS Position
+                    FROM book_import
+                    WHERE Error IS NULL
+                ) d
+                WHERE d.Line_Number = s.Line_Number AND d.Position > 1;
+            """)
+
             cursor.execute("""
-                SELECT DATE_TRUNC('month', Order_Date) as Month, COUNT(*) as OrderCount
-                FROM orders
-                GROUP BY Month
-                ORDER BY Month;
+                UPDATE book_import s
+                SET Error = 'Quantity and Price required for new books'
+                WHERE Error IS NULL
+                  AND (NULLIF(TRIM(Quantity), '') IS NULL OR NULLIF(TRIM(Price), '') IS NULL)
+                  AND NOT EXISTS (SELECT 1 FROM inventory i WHERE i.ISBN = s.ISBN);
             """)
 
-        rows = cursor.fetchall()
+            cursor.execute(IMPORT_BOOKS_MERGE_QUERY)
+            inserted, updated = cursor.fetchone()
 
-        result = []
-        for row in rows:
-            result.append({
-                'month': row[0].strftime('%Y-%m'),
-                'orderCount': row[1]
-            })
+            cursor.execute(IMPORT_INVENTORY_MERGE_QUERY)
 
-        conn.close()
-        return jsonify({'data': result}), 200
+            cursor.execute("""
+                SELECT Line_Number, Error
+                FROM book_import
+                WHERE Error IS NOT NULL
+                ORDER BY Line_Number
+                LIMIT %s;
+            """, (IMPORT_MAX_REJECTS,))
+            rejects = [{'line': row[0], 'error': row[1]} for row in cursor.fetchall()]
+
+            cursor.execute("SELECT COUNT(*) FROM book_import WHERE Error IS NOT NULL;")
+            rejected = cursor.fetchone()[0]
+
+            bump_data_versions(cursor, 'catalog', 'inventory')
+            conn.commit()
+            count_cache.clear()
+
+            return jsonify({
+                'message': 'Books imported successfully',
+                'inserted': inserted,
+                'updated': updated,
+                'rejected': rejected,
+                'rejects': rejects
+            }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/stats/publisher-distribution', methods=['GET'])
-@token_required
-def publisher_distribution(user_id):
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", 2000))
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 64 * 1024))
+
+
+def export_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def export_chunks(query, params, columns, export_format):
     """
-    Get the distribution of books by publisher.
-    ---
-    responses:
-      200:
-        description: List of publishers with book counts
-        schema:
+    Run `query` on a server-side cursor and yield its rows as CSV or NDJSON chunks.
+
+    Rows are fetched EXPORT_FETCH_SIZE at a time and emitted in chunks of
+    about EXPORT_CHUNK_SIZE characters, so memory use does not grow with the
+    size of the export. The connection stays checked out until the generator
+    finishes or is closed because the client went away. The first chunk is
+    yielded once the query has started, which lets the caller report errors
+    before the response begins.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor(name=f'export_{uuid.uuid4().hex}')
+        cursor.itersize = EXPORT_FETCH_SIZE
+        cursor.execute(query, params)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == 'csv':
+            writer.writerow(columns)
+
+        for row in cursor:
+            if export_format == 'csv':
+                writer.writerow(export_value(value) for value in row)
+            else:
+                buffer.write(json.dumps(dict(zip(columns, map(export_value, row)))))
+                buffer.write("\n")
+
+            if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        cursor.close()
+        conn.commit()
+        yield buffer.getvalue()
+
+
+def export_response(name, query, params, columns):
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+
+    chunks = export_chunks(query, params, columns, export_format)
+    try:
+        first_chunk = next(chunks)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    def stream():
+        yield first_chunk
+        yield from chunks
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = app.response_class(stream(), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{export_format}'
+    return response
+
+
+@app.route('/admin/books/export', methods=['GET'])
+@token_required
+def export_books(user_id):
+    """
+    Stream every book with its inventory and rating summary as CSV or NDJSON.
+    ---
+    parameters:
+      - name: format
+        in: query
+        required: false
+        description: Export format, csv (default) or ndjson
+        schema:
+          type: string
+    responses:
+      200:
+        description: The books, ordered by ISBN
+      400:
+        description: Bad request
+      500:
+        description: Internal server error
+    """
+    return export_response('books', """
+        SELECT
+            b.ISBN,
+            b.Book_Title,
+            b.Book_Author,
+            b.Year_Of_Publication,
+            b.Publisher,
+            b.Image_URL,
+            i.Quantity,
+            i.Price,
+            COALESCE(s.Rating_Count, 0),
+            ROUND(COALESCE(s.Average_Rating, 0), 2)
+        FROM
+            books b
+        LEFT JOIN
+            inventory i ON b.ISBN = i.ISBN
+        LEFT JOIN
+            book_stats s ON b.ISBN = s.ISBN
+        ORDER BY
+            b.ISBN;
+    """, (), (
+        'ISBN', 'Book_Title', 'Book_Author', 'Year_Of_Publication', 'Publisher', 'Image_URL',
+        'Quantity', 'Price', 'Rating_Count', 'Average_Rating'
+    ))
+
+
+@app.route('/admin/orders/export', methods=['GET'])
+@token_required
+def export_orders(user_id):
+    """
+    Stream every order line as CSV or NDJSON.
+    ---
+    parameters:
+      - name: format
+        in: query
+        required: false
+        description: Export format, csv (default) or ndjson
+        schema:
+          type: string
+    responses:
+      200:
+        description: One row per order line, ordered by order
+      400:
+        description: Bad request
+      500:
+        description: Internal server error
+    """
+    return export_response('orders', """
+        SELECT
+            o.Order_ID,
+            o.User_ID,
+            o.Address,
+            o.Order_Date,
+            oi.ISBN,
+            oi.Quantity,
+            oi.Unit_Price
+        FROM
+            orders o
+        JOIN
+            order_items oi ON o.Order_ID = oi.Order_ID
+        ORDER BY
+            o.Order_ID,
+            oi.ISBN;
+    """, (), ('Order_ID', 'User_ID', 'Address', 'Order_Date', 'ISBN', 'Quantity', 'Unit_Price'))
+
+
+class StatsCache:
+    """
+    Bounded LRU cache of admin statistics with stale-while-revalidate.
+
+    Entries are tagged with the data_versions counters they were computed
+    from. An entry whose counters have moved on because an order was placed
+    or a book changed is invalid and recomputed in the request, so a write
+    shows up on the next load. An entry with current counters is served as
+    is within its TTL, and for up to `stale_ttl` seconds past it while a
+    single background thread recomputes it.
+
+    rebuild_order_stats clears it, so statistics computed from the order
+    history before a rebuild are never served stale after it.
+    """
+
+    def __init__(self, max_entries, stale_ttl):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key, ttl, versions, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            value, value_versions, computed_at = entry
+            age = time.monotonic() - computed_at
+            if value_versions == versions and age < ttl:
+                return value, value_versions
+            if value_versions == versions and age < ttl + self.stale_ttl:
+                self._refresh_in_background(key, versions, compute)
+                return value, value_versions
+
+        value = compute()
+        self._set(key, value, versions)
+        return value, versions
+
+    def _set(self, key, value, versions):
+        with self._lock:
+            self._entries[key] = (value, versions, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _refresh_in_background(self, key, versions, compute):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._set(key, compute(), versions)
+            except Exception:
+                app.logger.exception("Failed to refresh statistics %s", key)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+stats_cache = StatsCache(
+    max_entries=int(os.getenv("STATS_CACHE_SIZE", 256)),
+    stale_ttl=float(os.getenv("STATS_CACHE_STALE_TTL", 60)),
+)
+STATS_CACHE_TTLS = {
+    'orders-per-month': float(os.getenv("STATS_ORDERS_PER_MONTH_TTL", 60)),
+    'earnings-per-month': float(os.getenv("STATS_EARNINGS_PER_MONTH_TTL", 60)),
+    'publisher-distribution': float(os.getenv("STATS_PUBLISHER_DISTRIBUTION_TTL", 600)),
+}
+
+
+def cached_stats(name, params, compute):
+    """
+    Serve a statistic from stats_cache. Call from a route under conditional_get.
+    """
+    versions = g.data_versions
+    value, value_versions = stats_cache.get(
+        (name,) + params,
+        STATS_CACHE_TTLS[name],
+        tuple(sorted(versions.items())),
+        compute,
+    )
+    g.response_data_versions = dict(value_versions)
+    return value
+
+
+ORDERS_PER_MONTH_QUERY = """
+SELECT Month, Order_Count
+FROM order_stats_monthly
+ORDER BY Month;
+"""
+
+
+ORDERS_PER_MONTH_IN_YEAR_QUERY = """
+SELECT Month, Order_Count
+FROM order_stats_monthly
+WHERE EXTRACT(YEAR FROM Month) = %s
+ORDER BY Month;
+"""
+
+
+PUBLISHER_DISTRIBUTION_QUERY = """
+SELECT
+    CASE WHEN Position <= 10 THEN Publisher ELSE 'Others' END,
+    SUM(BooksCount)::INTEGER
+FROM (
+    SELECT
+        COALESCE(NULLIF(Publisher, ''), 'Unknown') AS Publisher,
+        COUNT(*) AS BooksCount,
+        ROW_NUMBER() OVER (ORDER BY COUNT(*) DESC) AS Position
+    FROM books
+    GROUP BY 1
+) ranked
+GROUP BY 1, Position <= 10
+ORDER BY MIN(Position);
+"""
+
+
+EARNINGS_PER_MONTH_QUERY = """
+SELECT TO_CHAR(Month, 'YYYY-MM'), Revenue
+FROM order_stats_monthly
+WHERE EXTRACT(YEAR FROM Month) = %s
+ORDER BY Month;
+"""
+
+
+def compute_orders_per_month(year):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        if year:
+            cursor.execute(ORDERS_PER_MONTH_IN_YEAR_QUERY, (year,))
+        else:
+            cursor.execute(ORDERS_PER_MONTH_QUERY)
+
+        rows = cursor.fetchall()
+
+        result = []
+        for row in rows:
+            result.append({
+                'month': row[0].strftime('%Y-%m'),
+                'orderCount': row[1]
+            })
+
+        return result
+
+
+def compute_publisher_distribution():
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute(PUBLISHER_DISTRIBUTION_QUERY)
+
+        rows = cursor.fetchall()
+
+        result = []
+        for row in rows:
+            result.append({
+                'publisher': row[0],
+                'booksCount': row[1]
+            })
+
+        return result
+
+
+def compute_earnings_per_month(year):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute(EARNINGS_PER_MONTH_QUERY, (year,))
+
+        rows = cursor.fetchall()
+
+        result = []
+        for row in rows:
+            result.append({
+                'month': row[0],
+                'earnings': float(row[1]) if row[1] else 0.0
+            })
+
+        return result
+
+
+@app.route('/stats/orders-per-month', methods=['GET'])
+@token_required
+@conditional_get('orders')
+def orders_per_month(user_id):
+    """
+    Get the number of orders placed per month.
+    ---
+    parameters:
+      - name: year
+        in: query
+        required: false
+        description: Year to filter orders
+        schema:
+          type: integer
+    responses:
+      200:
+        description: List of orders per month
+        schema:
           type: object
           properties:
             data:
@@ -1207,51 +2871,54 @@ def publisher_distribution(user_id):
               items:
                 type: object
                 properties:
-                  publisher:
+                  month:
                     type: string
-                  booksCount:
+                  orderCount:
                     type: integer
       500:
         description: Internal server error
       400:
         description: Bad request
     """
+    year = request.args.get('year')
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT Publisher, COUNT(*) as BooksCount
-            FROM books
-            GROUP BY Publisher
-            ORDER BY BooksCount DESC;
-        """)
-
-        rows = cursor.fetchall()
-
-        top_publishers = []
-        others_count = 0
-
-        for idx, row in enumerate(rows):
-            publisher = row[0] if row[0] else 'Unknown'
-            books_count = row[1]
+        result = cached_stats('orders-per-month', (year,), lambda: compute_orders_per_month(year))
+        return jsonify({'data': result}), 200
 
-            if idx < 10:
-                top_publishers.append({
-                    'publisher': publisher,
-                    'booksCount': books_count
-                })
-            else:
-                others_count += books_count
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        if others_count > 0:
-            top_publishers.append({
-                'publisher': 'Others',
-                'booksCount': others_count
-            })
 
-        conn.close()
-        return jsonify({'data': top_publishers}), 200
+@app.route('/stats/publisher-distribution', methods=['GET'])
+@token_required
+@conditional_get('catalog')
+def publisher_distribution(user_id):
+    """
+    Get the distribution of books by publisher.
+    ---
+    responses:
+      200:
+        description: List of publishers with book counts
+        schema:
+          type: object
+          properties:
+            data:
+              type: array
+              items:
+                type: object
+                properties:
+                  publisher:
+                    type: string
+                  booksCount:
+                    type: integer
+      500:
+        description: Internal server error
+      400:
+        description: Bad request
+    """
+    try:
+        result = cached_stats('publisher-distribution', (), compute_publisher_distribution)
+        return jsonify({'data': result}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1259,6 +2926,7 @@ def publisher_distribution(user_id):
 
 @app.route('/stats/earnings-per-month', methods=['GET'])
 @token_required
+@conditional_get('orders')
 def earnings_per_month(user_id):
     """
     Get the total earnings per month.
@@ -1292,43 +2960,326 @@ def earnings_per_month(user_id):
     """
     try:
         year = request.args.get('year', type=int)
+        result = cached_stats('earnings-per-month', (year,), lambda: compute_earnings_per_month(year))
+        return jsonify({'data': result}), 200
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        cursor.execute("""
-            SELECT
-                TO_CHAR(o.Order_Date, 'YYYY-MM') AS month,
-                SUM(i.Price) AS total_earnings
-            FROM
-                orders o
-            JOIN
-                order_items oi ON o.Order_ID = oi.Order_ID
-            JOIN
-                inventory i ON oi.ISBN = i.ISBN
-            WHERE
-                EXTRACT(YEAR FROM o.Order_Date) = %s
-            GROUP BY
-                month
-            ORDER BY
-                month;
-        """, (year,))
 
-        rows = cursor.fetchall()
+@app.route('/admin/book-stats/rebuild', methods=['POST'])
+@token_required
+def rebuild_book_stats(user_id):
+    """
+    Rebuild the per-book rating aggregates from the ratings table.
+    ---
+    responses:
+      200:
+        description: Book stats rebuilt successfully
+        schema:
+          type: object
+          properties:
+            booksRated:
+              type: integer
+      500:
+        description: Internal server error
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        result = []
-        for row in rows:
-            result.append({
-                'month': row[0],
-                'earnings': float(row[1]) if row[1] else 0.0
-            })
+            cursor.execute("SELECT rebuild_book_stats();")
+            books_rated = cursor.fetchone()[0]
 
-        conn.close()
-        return jsonify({'data': result}), 200
+            bump_data_versions(cursor, 'ratings')
+            conn.commit()
+            return jsonify({'message': 'Book stats rebuilt successfully', 'booksRated': books_rated}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/admin/order-stats/rebuild', methods=['POST'])
+@token_required
+def rebuild_order_stats(user_id):
+    """
+    Rebuild the monthly order rollups from the orders table.
+    ---
+    responses:
+      200:
+        description: Order stats rebuilt successfully
+        schema:
+          type: object
+          properties:
+            months:
+              type: integer
+      500:
+        description: Internal server error
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("SELECT rebuild_order_stats_monthly();")
+            months = cursor.fetchone()[0]
+
+            bump_data_versions(cursor, 'orders')
+            conn.commit()
+            stats_cache.clear()
+            return jsonify({'message': 'Order stats rebuilt successfully', 'months': months}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", 4))
+# Read routes with small JSON bodies; exports stream and writes are never batched
+BATCHABLE_ENDPOINTS = frozenset({
+    'get_total_books', 'get_books', 'get_book', 'get_books_batch',
+    'get_my_total_reviews', 'get_my_reviews', 'get_review_status',
+    'get_total_cart', 'get_books_cart', 'check_if_in_cart', 'get_order_status',
+    'orders_per_month', 'publisher_distribution', 'earnings_per_month',
+})
+url_adapter = app.url_map.bind('localhost')
+
+
+def resolve_batch_request(item):
+    if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+        raise ValueError('Each request needs a path')
+    if item.get('method', 'GET').upper() != 'GET':
+        raise ValueError('Only GET requests can be batched')
+
+    url = urlsplit(item['path'])
+    params = item.get('params') or {}
+    if not isinstance(params, dict):
+        raise ValueError('params must be an object')
+
+    query_string = urlencode(parse_qsl(url.query) + [(key, str(value)) for key, value in params.items()])
+    return url.path, query_string
+
+
+def run_batch_request(user_id, path, query_string):
+    try:
+        endpoint, view_args = url_adapter.match(path, method='GET')
+    except HTTPException as e:
+        return {'status': e.code, 'body': {'error': e.description}}
+
+    if endpoint not in BATCHABLE_ENDPOINTS:
+        return {'status': 400, 'body': {'error': 'Route cannot be batched'}}
+
+    view = app.view_functions[endpoint]
+    try:
+        with app.test_request_context(path, method='GET', query_string=query_string):
+            # The batch token was already verified, so call past token_required
+            response = app.make_response(view.__wrapped__(user_id, **view_args))
+            if response.is_streamed:
+                response.close()
+                return {'status': 400, 'body': {'error': 'Route cannot be batched'}}
+    except Exception as e:
+        # A failing sub-request fails its own entry, not the whole batch
+        return {'status': 500, 'body': {'error': str(e)}}
+
+    return {'status': response.status_code, 'body': response.get_json(silent=True)}
+
+
+@app.route('/batch', methods=['POST'])
+@token_required
+def batch(user_id):
+    """
+    Execute several GET requests in one round trip.
+    ---
+    parameters:
+      - name: requests
+        in: body
+        required: true
+        description: Sub-requests to the authenticated read routes in BATCHABLE_ENDPOINTS, e.g. {"path": "/book", "params": {"isbn": "..."}}
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              path:
+                type: string
+              params:
+                type: object
+      - name: parallel
+        in: body
+        required: false
+        description: Run sub-requests concurrently on separate connections instead of sequentially on one
+        schema:
+          type: boolean
+    responses:
+      200:
+        description: One result per sub-request, in request order
+        schema:
+          type: object
+          properties:
+            responses:
+              type: array
+              items:
+                type: object
+                properties:
+                  status:
+                    type: integer
+                  body:
+                    type: object
+      400:
+        description: Bad request
+      500:
+        description: Internal server error
+    """
+    data = request.json
+    if not data or not isinstance(data.get('requests'), list) or not data['requests']:
+        return jsonify({'error': 'No requests provided'}), 400
+
+    if len(data['requests']) > BATCH_MAX_REQUESTS:
+        return jsonify({'error': f'At most {BATCH_MAX_REQUESTS} requests can be batched'}), 400
+
+    try:
+        sub_requests = [resolve_batch_request(item) for item in data['requests']]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        if data.get('parallel') and len(sub_requests) > 1:
+            with ThreadPoolExecutor(max_workers=min(BATCH_MAX_PARALLEL, len(sub_requests))) as executor:
+                responses = list(executor.map(lambda sub: run_batch_request(user_id, *sub), sub_requests))
+        else:
+            with pin_db_connection():
+                responses = [run_batch_request(user_id, *sub) for sub in sub_requests]
+
+        return jsonify({'responses': responses}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/admin/token-cache-stats', methods=['GET'])
+@token_required
+def token_cache_stats(user_id):
+    """
+    Get statistics of the verified-token cache used by token_required.
+    ---
+    responses:
+      200:
+        description: Token cache statistics
+        schema:
+          type: object
+          properties:
+            tokenCache:
+              type: object
+              properties:
+                size:
+                  type: integer
+                hits:
+                  type: integer
+                misses:
+                  type: integer
+    """
+    return jsonify({'tokenCache': token_cache.stats()}), 200
+
+
+@app.route('/admin/pool-stats', methods=['GET'])
+@token_required
+def pool_stats(user_id):
+    """
+    Get database connection pool statistics.
+    ---
+    responses:
+      200:
+        description: Connection pool statistics
+        schema:
+          type: object
+          properties:
+            pool:
+              type: object
+              properties:
+                size:
+                  type: integer
+                inUse:
+                  type: integer
+                idle:
+                  type: integer
+                checkouts:
+                  type: integer
+                timeouts:
+                  type: integer
+    """
+    return jsonify({'pool': get_db_pool().stats()}), 200
+
+
+@app.route('/admin/query-stats', methods=['GET'])
+@token_required
+def get_query_stats(user_id):
+    """
+    Get per-fingerprint statistics of the SQL statements run by this worker.
+    ---
+    parameters:
+      - name: limit
+        in: query
+        required: false
+        description: Number of statements to return, by descending total time (default 50)
+        schema:
+          type: integer
+    responses:
+      200:
+        description: Statements grouped by normalized text
+        schema:
+          type: object
+          properties:
+            slowQueryThresholdMs:
+              type: number
+            queries:
+              type: array
+              items:
+                type: object
+                properties:
+                  fingerprint:
+                    type: string
+                  query:
+                    type: string
+                  calls:
+                    type: integer
+                  errors:
+                    type: integer
+                  slowCalls:
+                    type: integer
+                  totalMs:
+                    type: number
+                  meanMs:
+                    type: number
+                  maxMs:
+                    type: number
+                  lastRoute:
+                    type: string
+      400:
+        description: Bad request
+    """
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+
+    return jsonify({
+        'slowQueryThresholdMs': SLOW_QUERY_THRESHOLD_MS,
+        'queries': query_stats.stats(limit)
+    }), 200
+
+
+@app.route('/admin/query-stats', methods=['DELETE'])
+@token_required
+def reset_query_stats(user_id):
+    """
+    Reset the SQL statement statistics of this worker.
+    ---
+    responses:
+      200:
+        description: Statistics reset
+    """
+    query_stats.clear()
+    return jsonify({'message': 'Query statistics reset'}), 200
+
+
 if __name__ == '__main__':
     app.run(debug=True, port=3050, host='0.0.0.0')
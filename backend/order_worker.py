@@ -0,0 +1,103 @@
+import json
+import logging
+import os
+import select
+import time
+
+import psycopg2
+
+from main import OrderError, create_order, get_db_connection
+
+BATCH_SIZE = int(os.getenv("ORDER_WORKER_BATCH_SIZE", 50))
+POLL_INTERVAL = float(os.getenv("ORDER_WORKER_POLL_INTERVAL", 5))
+
+logger = logging.getLogger("order_worker")
+
+
+def queued_order_items(items):
+    """(isbn, quantity) pairs of a queued order; orders queued before quantities were stored list one ISBN per copy."""
+    if isinstance(items, str):
+        items = json.loads(items)
+    return [(item, 1) if isinstance(item, str) else tuple(item) for item in items]
+
+
+def process_batch():
+    """
+    Fulfil up to BATCH_SIZE pending orders from order_queue in one transaction.
+
+    Rows are claimed with SKIP LOCKED so several workers can drain the queue
+    side by side. Each order runs under its own savepoint, so a rejected or
+    failing order is recorded without undoing the rest of the batch.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT Queue_ID, Order_ID, User_ID, Address, Items
+            FROM order_queue
+            WHERE Status = 'pending'
+            ORDER BY Queue_ID
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED;
+        """, (BATCH_SIZE,))
+        queued = cursor.fetchall()
+
+        for queue_id, order_id, user_id, address, items in queued:
+            cursor.execute("SAVEPOINT queued_order;")
+            try:
+                create_order(cursor, user_id, address, queued_order_items(items), order_id=order_id)
+                status, error = 'completed', None
+            except OrderError as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT queued_order;")
+                status, error = 'rejected', str(e)
+            except Exception as e:
+                # Any other failure is recorded against this order alone, so a
+                # bad payload cannot stall the orders queued behind it
+                logger.exception("Failed to fulfil queued order %s", order_id)
+                cursor.execute("ROLLBACK TO SAVEPOINT queued_order;")
+                status, error = 'rejected', str(e)
+
+            cursor.execute("""
+                UPDATE order_queue
+                SET Status = %s, Error = %s, Processed_At = CURRENT_TIMESTAMP
+                WHERE Queue_ID = %s;
+            """, (status, error, queue_id))
+
+        conn.commit()
+        return len(queued)
+
+
+def wait_for_orders(listen_conn):
+    if select.select([listen_conn], [], [], POLL_INTERVAL) != ([], [], []):
+        listen_conn.poll()
+        listen_conn.notifies.clear()
+
+
+def run():
+    listen_conn = psycopg2.connect(
+        host=os.getenv("POSTGRES_HOST"),
+        database=os.getenv("POSTGRES_DB"),
+        user=os.getenv("POSTGRES_USER"),
+        password=os.getenv("POSTGRES_PASSWORD"),
+    )
+    listen_conn.autocommit = True
+    listen_conn.cursor().execute("LISTEN order_queue;")
+
+    logger.info("Order worker started (batch size %s)", BATCH_SIZE)
+    while True:
+        try:
+            processed = process_batch()
+        except Exception:
+            logger.exception("Failed to process order batch")
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        if processed:
+            logger.info("Processed %s queued orders", processed)
+        if processed < BATCH_SIZE:
+            wait_for_orders(listen_conn)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    run()
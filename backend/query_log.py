@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import psycopg2
+import psycopg2.extensions
+from flask import has_request_context, request
+
+from metrics import TimedCursor
+
+# Every statement the backend runs goes through QueryLogCursor, the pool's
+# cursor_factory. Statements are grouped by a fingerprint of their normalized
+# text into query_stats, and those slower than SLOW_QUERY_THRESHOLD_MS are
+# logged with the route, the parameters and, optionally, the plan.
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+SLOW_QUERY_LOG_PARAMS = os.getenv("SLOW_QUERY_LOG_PARAMS", "true").lower() in ('1', 'true', 'yes')
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() in ('1', 'true', 'yes')
+SLOW_QUERY_LOG_MAX_CHARS = 2000
+EXPLAINABLE_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'VALUES')
+
+NORMALIZE_PATTERNS = (
+    (re.compile(r'--[^\n]*|/\*.*?\*/', re.S), ' '),
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%\(\w+\)s|%s'), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\?(?:\s*,\s*\?)+'), '?, ...'),
+    (re.compile(r'\s+'), ' '),
+)
+
+logger = logging.getLogger("slow_query")
+
+
+def normalize_query(query):
+    """Strip literals, placeholders and layout from a statement, so its variants group together."""
+    for pattern, replacement in NORMALIZE_PATTERNS:
+        query = pattern.sub(replacement, query)
+    return query.strip().rstrip(';').strip()
+
+
+def fingerprint(query):
+    return hashlib.sha1(query.encode()).hexdigest()[:16]
+
+
+class QueryStats:
+    """
+    Bounded LRU map of statement fingerprints to call counts and timings.
+
+    Each gunicorn worker keeps its own, so the admin endpoint reports on the
+    worker that serves it.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, key, query, seconds, slow, failed, route):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    'query': query,
+                    'calls': 0,
+                    'errors': 0,
+                    'slowCalls': 0,
+                    'totalSeconds': 0.0,
+                    'maxSeconds': 0.0,
+                    'lastRoute': None,
+                }
+            entry['calls'] += 1
+            entry['errors'] += failed
+            entry['slowCalls'] += slow
+            entry['totalSeconds'] += seconds
+            entry['maxSeconds'] = max(entry['maxSeconds'], seconds)
+            entry['lastRoute'] = route or entry['lastRoute']
+
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self, limit=None):
+        with self._lock:
+            entries = [(key, dict(entry)) for key, entry in self._entries.items()]
+
+        entries.sort(key=lambda item: item[1]['totalSeconds'], reverse=True)
+        return [
+            {
+                'fingerprint': key,
+                'query': entry['query'],
+                'calls': entry['calls'],
+                'errors': entry['errors'],
+                'slowCalls': entry['slowCalls'],
+                'totalMs': round(entry['totalSeconds'] * 1000, 3),
+                'meanMs': round(entry['totalSeconds'] * 1000 / entry['calls'], 3),
+                'maxMs': round(entry['maxSeconds'] * 1000, 3),
+                'lastRoute': entry['lastRoute'],
+            }
+            for key, entry in entries[:limit]
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+query_stats = QueryStats(max_entries=int(os.getenv("QUERY_STATS_SIZE", 1000)))
+
+
+def current_route():
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return None
+
+
+def truncate(text):
+    return text if len(text) <= SLOW_QUERY_LOG_MAX_CHARS else text[:SLOW_QUERY_LOG_MAX_CHARS] + '...'
+
+
+class QueryLogCursor(TimedCursor):
+    """Cursor that records every statement in query_stats and logs the slow and failing ones."""
+
+    def execute(self, query, vars=None):
+        return self._logged(super().execute, query, vars, explain=True)
+
+    def executemany(self, query, vars_list):
+        return self._logged(super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        copy = super().copy_expert
+        return self._logged(lambda statement, _: copy(statement, file, size), sql)
+
+    def _logged(self, run, query, vars=None, explain=False):
+        started = time.perf_counter()
+        error = None
+        try:
+            return run(query, vars)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._observe(query, vars, time.perf_counter() - started, error, explain)
+
+    def _observe(self, query, vars, seconds, error, explain):
+        if not isinstance(query, str):
+            query = query.as_string(self.connection) if hasattr(query, 'as_string') else query.decode()
+
+        normalized = normalize_query(query)
+        key = fingerprint(normalized)
+        route = current_route()
+        slow = seconds * 1000 >= SLOW_QUERY_THRESHOLD_MS
+        query_stats.record(key, truncate(normalized), seconds, slow, error is not None, route)
+
+        if error is not None:
+            logger.warning(
+                "Query %s on %s failed after %.1f ms: %s: %s",
+                key, route or '-', seconds * 1000, self._statement(query, vars, normalized), str(error).strip()
+            )
+        elif slow:
+            plan = self._plan(query, vars) if explain and SLOW_QUERY_EXPLAIN else None
+            logger.warning(
+                "Slow query %s on %s took %.1f ms: %s%s",
+                key, route or '-', seconds * 1000, self._statement(query, vars, normalized),
+                f"\n{plan}" if plan else ""
+            )
+
+    def _statement(self, query, vars, normalized):
+        """The statement for the log: with its parameters bound if SLOW_QUERY_LOG_PARAMS is on."""
+        if not SLOW_QUERY_LOG_PARAMS:
+            return truncate(normalized)
+        if vars is None:
+            return truncate(" ".join(query.split()))
+        try:
+            statement = self.mogrify(query, vars).decode(errors='replace')
+        except Exception:
+            statement = f"{normalized} {vars!r}"
+        return truncate(" ".join(statement.split()))
+
+    def _plan(self, query, vars):
+        """
+        EXPLAIN (without ANALYZE, so nothing runs twice) a slow statement.
+
+        Inside a transaction the EXPLAIN runs under a savepoint, so a failure
+        cannot abort the caller's transaction.
+        """
+        if not query.lstrip().upper().startswith(EXPLAINABLE_STATEMENTS):
+            return None
+
+        conn = self.connection
+        in_transaction = conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        cursor = psycopg2.extensions.cursor(conn)
+        try:
+            if in_transaction:
+                cursor.execute("SAVEPOINT slow_query_explain;")
+            cursor.execute("EXPLAIN " + query, vars)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            if in_transaction:
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain;")
+            return plan
+        except psycopg2.Error as e:
+            if in_transaction:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain;")
+            return f"(no plan: {str(e).strip()})"
+        finally:
+            cursor.close()
@@ -0,0 +1,450 @@
+"""
+End-to-end load test for the auth and backend services.
+
+Seeds a scratch database from database/init-database.sql and database/*.csv,
+boots both services under gunicorn with their production settings, replays a
+weighted mix of user traffic from concurrent virtual users and writes the
+per-endpoint latency percentiles, throughput and error rates as JSON:
+
+    python3 benchmarks/load_test.py run --users 20 --duration 60 --output head.json
+    python3 benchmarks/load_test.py compare base.json head.json
+
+Database settings come from the usual POSTGRES_* variables; the scratch
+database is BENCH_DB (default books_bench) and is recreated on every run. Pass
+--backend-url and --auth-url to load services that are already running
+instead, in which case nothing is seeded or booted.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+import psycopg2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE_DIR = os.path.join(ROOT, 'database')
+COPY_PATTERN = re.compile(r"COPY\s+(\w+)\s*\(([^)]*)\)\s+FROM\s+'([^']+)'([^;]*);", re.IGNORECASE)
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+
+# (endpoint, weight): how often each action is picked by a virtual user.
+TRAFFIC_MIX = (
+    ('POST /auth/login', 2),
+    ('GET /books', 25),
+    ('GET /books?q', 12),
+    ('GET /books?search_mode=fulltext', 6),
+    ('GET /total-books', 4),
+    ('GET /book', 20),
+    ('POST /cart', 8),
+    ('GET /cart', 5),
+    ('DELETE /cart', 6),
+    ('POST /order', 3),
+    ('GET /stats/orders-per-month', 1),
+    ('GET /stats/publisher-distribution', 1),
+    ('GET /stats/earnings-per-month', 1),
+)
+
+
+def connect(database=None):
+    conn = psycopg2.connect(
+        host=os.getenv("POSTGRES_HOST", "127.0.0.1"),
+        port=os.getenv("POSTGRES_PORT", 5432),
+        database=database or os.getenv("POSTGRES_DB", "postgres"),
+        user=os.getenv("POSTGRES_USER", "postgres"),
+        password=os.getenv("POSTGRES_PASSWORD"),
+    )
+    conn.autocommit = True
+    return conn
+
+
+def seed_database(database, init_sql):
+    """
+    Recreate `database` and load it the way the database container does.
+
+    The COPY ... FROM '<file>' statements of the init script are run as
+    client-side COPY from the CSV files next to it, so the database server
+    needs no access to this checkout.
+    """
+    conn = connect()
+    conn.cursor().execute(f'DROP DATABASE IF EXISTS "{database}";')
+    conn.cursor().execute(f'CREATE DATABASE "{database}" ENCODING \'UTF8\' TEMPLATE template0;')
+    conn.close()
+
+    with open(init_sql, encoding='utf-8') as f:
+        script = f.read()
+
+    conn = connect(database)
+    cursor = conn.cursor()
+    position = 0
+    for match in COPY_PATTERN.finditer(script):
+        if script[position:match.start()].strip():
+            cursor.execute(script[position:match.start()])
+        table, columns, path, options = match.groups()
+        with open(os.path.join(os.path.dirname(init_sql), os.path.basename(path)), encoding='utf-8') as data:
+            cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN {options.strip()};", data)
+        position = match.end()
+    if script[position:].strip():
+        cursor.execute(script[position:])
+
+    cursor.execute("SELECT ISBN, Book_Title FROM books;")
+    books = cursor.fetchall()
+    conn.close()
+    return books
+
+
+def boot_service(name, port, workers, env):
+    service_env = dict(os.environ, **env)
+    service_env.update({
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'GUNICORN_WORKERS': str(workers),
+        'GUNICORN_ACCESS_LOG': os.devnull,
+    })
+    process = subprocess.Popen(
+        ['gunicorn', '--config', 'gunicorn.conf.py', 'main:app'],
+        cwd=os.path.join(ROOT, name),
+        env=service_env,
+        stdout=subprocess.DEVNULL,
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{name} exited with status {process.returncode}')
+        try:
+            http.client.HTTPConnection('127.0.0.1', port, timeout=1).request('GET', '/apidocs/')
+            return process
+        except OSError:
+            time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError(f'{name} did not start listening on port {port}')
+
+
+class Client:
+    """Keep-alive HTTP client for one base URL, owned by a single virtual user."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, token=None):
+        headers = {}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        for attempt in range(2):
+            reused = self.conn is not None
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                try:
+                    self.conn.request(method, path, body=body, headers=headers)
+                except (http.client.RemoteDisconnected, ConnectionError):
+                    # The server closed the idle keep-alive socket before the
+                    # request went out, so any method is safe to send again
+                    if not reused:
+                        raise
+                    self.reset()
+                    continue
+                response = self.conn.getresponse()
+                data = response.read()
+                return response.status, data
+            except (http.client.HTTPException, OSError):
+                self.reset()
+                # The server may have acted on a request that failed after it
+                # was sent, so only methods without side effects are retried
+                if attempt or method not in IDEMPOTENT_METHODS:
+                    raise
+
+    def reset(self):
+        self.conn.close()
+        self.conn = None
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.recording = False
+
+    def record(self, endpoint, seconds, ok):
+        if not self.recording:
+            return
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append((seconds, ok))
+
+
+class VirtualUser(threading.Thread):
+    """
+    One simulated shopper: registers, then picks actions from TRAFFIC_MIX
+    until `stop` is set. Failed requests and 4xx/5xx responses count as errors.
+    """
+
+    def __init__(self, number, args, books, recorder, stop):
+        super().__init__(daemon=True)
+        self.args = args
+        self.books = books
+        self.recorder = recorder
+        self.stop = stop
+        self.random = random.Random(args.seed + number)
+        self.backend = Client(args.backend_url, args.timeout)
+        self.auth = Client(args.auth_url, args.timeout)
+        self.username = f'bench_{uuid.uuid4().hex[:12]}'
+        self.password = uuid.uuid4().hex
+        self.token = None
+        self.cart = []
+        self.endpoints = [endpoint for endpoint, _ in TRAFFIC_MIX]
+        self.weights = [weight for _, weight in TRAFFIC_MIX]
+
+    def call(self, endpoint, client, method, path, body=None, authenticated=True):
+        started = time.perf_counter()
+        try:
+            status, data = client.request(method, path, body, self.token if authenticated else None)
+        except Exception:
+            self.recorder.record(endpoint, time.perf_counter() - started, False)
+            return None, None
+
+        self.recorder.record(endpoint, time.perf_counter() - started, status < 400)
+        return status, data
+
+    def login(self):
+        status, data = self.call(
+            'POST /auth/login', self.auth, 'POST', '/auth/login',
+            {'username': self.username, 'password': self.password}, authenticated=False
+        )
+        if status == 200:
+            self.token = json.loads(data)['access_token']
+
+    def search_term(self):
+        words = re.findall(r'[A-Za-z]{4,}', self.random.choice(self.books)[1] or '')
+        return self.random.choice(words) if words else 'the'
+
+    def run(self):
+        status, data = self.call(
+            'POST /auth/register', self.auth, 'POST', '/auth/register',
+            {'username': self.username, 'password': self.password}, authenticated=False
+        )
+        if status == 200:
+            self.token = json.loads(data)['access_token']
+
+        while not self.stop.is_set():
+            endpoint = self.random.choices(self.endpoints, self.weights)[0]
+            self.act(endpoint)
+
+    def act(self, endpoint):
+        isbn = self.random.choice(self.books)[0]
+
+        if endpoint == 'POST /auth/login':
+            self.login()
+        elif endpoint == 'GET /books':
+            query = {'page': self.random.randint(1, 20), 'limit': 10, 'include_total': self.random.random() < 0.2}
+            self.call(endpoint, self.backend, 'GET', '/books?' + urlencode(query))
+        elif endpoint == 'GET /books?q':
+            self.call(endpoint, self.backend, 'GET', '/books?' + urlencode({'q': self.search_term()}))
+        elif endpoint == 'GET /books?search_mode=fulltext':
+            query = {'q': self.search_term(), 'search_mode': 'fulltext'}
+            self.call(endpoint, self.backend, 'GET', '/books?' + urlencode(query))
+        elif endpoint == 'GET /total-books':
+            self.call(endpoint, self.backend, 'GET', '/total-books')
+        elif endpoint == 'GET /book':
+            self.call(endpoint, self.backend, 'GET', '/book?' + urlencode({'isbn': isbn}))
+        elif endpoint == 'POST /cart':
+            if isbn not in self.cart:
+                status, _ = self.call(endpoint, self.backend, 'POST', '/cart', {'isbn': isbn})
+                if status == 200:
+                    self.cart.append(isbn)
+        elif endpoint == 'GET /cart':
+            self.call(endpoint, self.backend, 'GET', '/cart')
+        elif endpoint == 'DELETE /cart':
+            if self.cart:
+                isbn = self.cart.pop(self.random.randrange(len(self.cart)))
+                self.call(endpoint, self.backend, 'DELETE', '/cart?' + urlencode({'isbn': isbn}), {'isbn': isbn})
+        elif endpoint == 'POST /order':
+            items = [{'isbn': item} for item in (self.cart or [isbn])]
+            status, _ = self.call(endpoint, self.backend, 'POST', '/order', {'address': 'Benchmark 1', 'items': items})
+            if status == 200:
+                self.cart = []
+        elif endpoint == 'GET /stats/orders-per-month':
+            self.call(endpoint, self.backend, 'GET', '/stats/orders-per-month')
+        elif endpoint == 'GET /stats/publisher-distribution':
+            self.call(endpoint, self.backend, 'GET', '/stats/publisher-distribution')
+        elif endpoint == 'GET /stats/earnings-per-month':
+            self.call(endpoint, self.backend, 'GET', '/stats/earnings-per-month?year=' + time.strftime('%Y'))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, seconds):
+    latencies = sorted(latency for latency, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'errorRate': round(errors / len(samples), 4) if samples else 0.0,
+        'throughputRps': round(len(samples) / seconds, 2),
+        'latencyMs': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'mean': round(sum(latencies) / len(latencies) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2),
+        },
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    services = []
+    try:
+        if args.backend_url is None or args.auth_url is None:
+            database = os.getenv("BENCH_DB", "books_bench")
+            print(f'Seeding {database}...', file=sys.stderr)
+            books = seed_database(database, args.init_sql)
+            env = {
+                'POSTGRES_DB': database,
+                'POSTGRES_POOL_MAX': str(args.threads + 2),
+                'GUNICORN_THREADS': str(args.threads),
+            }
+            services.append(boot_service('auth', args.auth_port, args.workers, env))
+            services.append(boot_service('backend', args.backend_port, args.workers, env))
+            args.auth_url = f'http://127.0.0.1:{args.auth_port}'
+            args.backend_url = f'http://127.0.0.1:{args.backend_port}'
+        else:
+            conn = connect(os.getenv("POSTGRES_DB"))
+            cursor = conn.cursor()
+            cursor.execute("SELECT ISBN, Book_Title FROM books;")
+            books = cursor.fetchall()
+            conn.close()
+
+        recorder = Recorder()
+        stop = threading.Event()
+        users = [VirtualUser(number, args, books, recorder, stop) for number in range(args.users)]
+        for user in users:
+            user.start()
+
+        print(f'Warming up for {args.warmup}s, measuring for {args.duration}s...', file=sys.stderr)
+        time.sleep(args.warmup)
+        recorder.recording = True
+        started = time.monotonic()
+        time.sleep(args.duration)
+        recorder.recording = False
+        elapsed = time.monotonic() - started
+        stop.set()
+        for user in users:
+            user.join(args.timeout + 1)
+    finally:
+        for process in services:
+            process.send_signal(signal.SIGTERM)
+        for process in services:
+            process.wait(30)
+
+    all_samples = [sample for samples in recorder.samples.values() for sample in samples]
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'config': {
+            'users': args.users,
+            'durationSeconds': args.duration,
+            'warmupSeconds': args.warmup,
+            'workers': args.workers,
+            'threads': args.threads,
+            'seed': args.seed,
+        },
+        'total': summarize(all_samples, elapsed) if all_samples else None,
+        'endpoints': {
+            endpoint: summarize(samples, elapsed) for endpoint, samples in sorted(recorder.samples.items())
+        },
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    print(output)
+
+
+def compare(args):
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.head, encoding='utf-8') as f:
+        head = json.load(f)
+
+    print(f"{'endpoint':40} {'p50 ms':>17} {'p95 ms':>17} {'p99 ms':>17} {'rps':>17} {'errors':>17}")
+    rows = [('total', base.get('total'), head.get('total'))]
+    rows += [(name, base['endpoints'].get(name), head['endpoints'].get(name))
+             for name in sorted(set(base['endpoints']) | set(head['endpoints']))]
+
+    for name, before, after in rows:
+        if not before or not after:
+            print(f'{name:40} only in {"head" if after else "base"}')
+            continue
+        cells = []
+        for key in ('p50', 'p95', 'p99'):
+            cells.append(change(before['latencyMs'][key], after['latencyMs'][key]))
+        cells.append(change(before['throughputRps'], after['throughputRps']))
+        cells.append(f"{before['errorRate']:.2%} -> {after['errorRate']:.2%}")
+        print(f'{name:40} ' + ' '.join(f'{cell:>17}' for cell in cells[:4]) + f' {cells[4]:>17}')
+
+
+def change(before, after):
+    if not before:
+        return f'{before} -> {after}'
+    return f'{after:g} ({(after - before) / before:+.0%})'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='seed, boot and load the services')
+    run_parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    run_parser.add_argument('--duration', type=float, default=60, help='measured seconds')
+    run_parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds before measuring')
+    run_parser.add_argument('--workers', type=int, default=2, help='gunicorn workers per service')
+    run_parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    run_parser.add_argument('--timeout', type=float, default=30, help='per-request timeout in seconds')
+    run_parser.add_argument('--seed', type=int, default=1, help='random seed for the traffic mix')
+    run_parser.add_argument('--init-sql', default=os.path.join(DATABASE_DIR, 'init-database.sql'))
+    run_parser.add_argument('--backend-port', type=int, default=13050)
+    run_parser.add_argument('--auth-port', type=int, default=13100)
+    run_parser.add_argument('--backend-url', help='load an already running backend instead')
+    run_parser.add_argument('--auth-url', help='load an already running auth service instead')
+    run_parser.add_argument('--output', help='also write the JSON report to this file')
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare', help='compare two JSON reports')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('head')
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
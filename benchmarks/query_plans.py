@@ -0,0 +1,542 @@
+"""
+Query plan regression harness for the backend's endpoint queries.
+
+Starts a throwaway Postgres cluster, creates the schema from
+database/init-database.sql and fills it with generated data at each of
+several scales, then runs every endpoint query from backend/main.py under
+EXPLAIN (ANALYZE, BUFFERS) and records its execution time, row estimates,
+buffer usage and plan as JSON. The hot write statements (placing an order,
+the inventory updates and the import merge) are explained too, each inside
+a transaction that is rolled back, so every run sees the same data:
+
+    python3 benchmarks/query_plans.py run --output base.json
+    python3 benchmarks/query_plans.py run --baseline base.json --output head.json
+    python3 benchmarks/query_plans.py compare base.json head.json
+
+Against a baseline, a query fails when its median execution time grows by
+more than --threshold (and --min-delta-ms), or when its plan gains a
+sequential scan of a table the baseline reached through an index; the exit
+status is then 1. initdb and pg_ctl are taken from --pg-bin or PATH; pass
+--use-env to use the POSTGRES_* server instead, which gets a scratch
+database named PLANS_DB (default books_plans).
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import psycopg2
+
+from load_test import COPY_PATTERN, DATABASE_DIR, ROOT, git_commit
+
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+
+import main as backend  # noqa: E402
+
+DEFAULT_SCALES = (1000, 10000, 100000)
+
+# Title words of the generated catalog; SEARCH_TERM is one of them.
+TITLE_WORDS = (
+    'garden', 'night', 'river', 'shadow', 'winter', 'secret', 'house', 'journey', 'stone', 'empire',
+    'silver', 'island', 'letters', 'mountain', 'storm', 'kingdom', 'memory', 'orchard', 'harbor', 'summer',
+    'forest', 'daughter', 'glass', 'fire', 'ocean', 'clock', 'crown', 'window', 'bridge', 'lantern',
+    'wolf', 'salt', 'paper', 'city', 'song', 'mirror', 'thunder', 'castle', 'desert', 'meadow',
+)
+SEARCH_TERM = 'lantern'
+
+GENERATE_DATA = """
+SELECT SETSEED(0.42);
+
+INSERT INTO books (ISBN, Book_Title, Book_Author, Year_Of_Publication, Publisher, Image_URL)
+SELECT
+    LPAD(i::TEXT, 10, '0'),
+    INITCAP(w[1 + MOD(i * 7, k)] || ' ' || w[1 + MOD(i * 13, k)] || ' of the ' || w[1 + MOD(i / 3, k)]),
+    'Author ' || MOD(i, GREATEST(%(books)s / 4, 1)),
+    1950 + MOD(i, 75),
+    'Publisher ' || FLOOR(POWER(RANDOM(), 3) * GREATEST(%(books)s / 50, 20))::INTEGER,
+    'http://images.example.com/' || i || '.jpg'
+FROM
+    GENERATE_SERIES(1, %(books)s) i,
+    (SELECT %(words)s::TEXT[] AS w, CARDINALITY(%(words)s::TEXT[]) AS k) words;
+
+INSERT INTO users (User_ID, Username, Password)
+SELECT 1 + i, 'user' || i, MD5(i::TEXT)
+FROM GENERATE_SERIES(1, %(users)s) i;
+
+SELECT SETVAL('users_user_id_seq', (SELECT MAX(User_ID) FROM users));
+
+INSERT INTO ratings (User_ID, ISBN, Book_Rating)
+SELECT
+    2 + FLOOR(POWER(RANDOM(), 2) * %(users)s)::INTEGER,
+    LPAD((1 + FLOOR(RANDOM() * %(books)s))::TEXT, 10, '0'),
+    FLOOR(RANDOM() * 11)::INTEGER
+FROM GENERATE_SERIES(1, %(books)s * 3)
+ON CONFLICT DO NOTHING;
+
+INSERT INTO inventory (ISBN, Quantity, Price)
+SELECT ISBN, FLOOR(RANDOM() * 50)::INTEGER, ROUND((5 + RANDOM() * 55)::NUMERIC, 2)
+FROM books;
+
+INSERT INTO orders (User_ID, Address, Order_Date)
+SELECT
+    2 + FLOOR(RANDOM() * %(users)s)::INTEGER,
+    'Street ' || i,
+    NOW() - RANDOM() * INTERVAL '3 years'
+FROM GENERATE_SERIES(1, %(orders)s) i;
+
+INSERT INTO order_items (Order_ID, ISBN, Quantity, Unit_Price)
+SELECT
+    o.Order_ID,
+    LPAD((1 + FLOOR(RANDOM() * %(books)s))::TEXT, 10, '0'),
+    1 + FLOOR(RANDOM() * 3)::INTEGER,
+    ROUND((5 + RANDOM() * 55)::NUMERIC, 2)
+FROM orders o, GENERATE_SERIES(1, 1 + MOD(o.Order_ID, 3))
+ON CONFLICT DO NOTHING;
+
+INSERT INTO cart_items (User_ID, ISBN)
+SELECT
+    2 + FLOOR(POWER(RANDOM(), 2) * %(users)s)::INTEGER,
+    LPAD((1 + FLOOR(RANDOM() * %(books)s))::TEXT, 10, '0')
+FROM GENERATE_SERIES(1, %(carts)s)
+ON CONFLICT DO NOTHING;
+
+INSERT INTO order_queue (Order_ID, User_ID, Idempotency_Key, Address, Items, Status)
+SELECT
+    NEXTVAL('orders_order_id_seq'),
+    2 + FLOOR(RANDOM() * %(users)s)::INTEGER,
+    MD5(i::TEXT),
+    'Street ' || i,
+    '[]',
+    CASE WHEN MOD(i, 10) = 0 THEN 'pending' ELSE 'completed' END
+FROM GENERATE_SERIES(1, %(queued)s) i;
+
+SELECT rebuild_book_stats();
+SELECT rebuild_order_stats_monthly();
+"""
+
+
+class EphemeralPostgres:
+    """A Postgres cluster in a temporary directory, removed on exit."""
+
+    def __init__(self, bin_dir=None):
+        self.bin_dir = bin_dir
+        self.directory = None
+
+    def command(self, name):
+        return os.path.join(self.bin_dir, name) if self.bin_dir else name
+
+    def __enter__(self):
+        self.directory = tempfile.mkdtemp(prefix='query-plans-')
+        data = os.path.join(self.directory, 'data')
+        subprocess.run(
+            [self.command('initdb'), '-D', data, '-U', 'postgres', '--auth=trust', '--no-locale',
+             '-E', 'UTF8', '--no-sync'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            self.port = s.getsockname()[1]
+
+        options = (
+            f"-p {self.port} -k {self.directory} -c listen_addresses='' "
+            "-c fsync=off -c synchronous_commit=off -c full_page_writes=off"
+        )
+        subprocess.run(
+            [self.command('pg_ctl'), '-D', data, '-o', options, '-l', os.path.join(self.directory, 'log'),
+             '-w', 'start'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        return {'host': self.directory, 'port': self.port, 'user': 'postgres'}
+
+    def __exit__(self, *exc_info):
+        subprocess.run(
+            [self.command('pg_ctl'), '-D', os.path.join(self.directory, 'data'), '-m', 'immediate', 'stop'],
+            stdout=subprocess.DEVNULL
+        )
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def env_server():
+    return {
+        'host': os.getenv("POSTGRES_HOST", "127.0.0.1"),
+        'port': os.getenv("POSTGRES_PORT", 5432),
+        'user': os.getenv("POSTGRES_USER", "postgres"),
+        'password': os.getenv("POSTGRES_PASSWORD"),
+    }
+
+
+def connect(server, database):
+    conn = psycopg2.connect(database=database, **server)
+    conn.autocommit = True
+    return conn
+
+
+def create_database(server, database, init_sql, scale):
+    """
+    Recreate `database` from the init script, without its CSV data, and fill
+    it with generated data for a catalog of `scale` books.
+    """
+    conn = connect(server, 'postgres')
+    conn.cursor().execute(f'DROP DATABASE IF EXISTS "{database}";')
+    conn.cursor().execute(f'CREATE DATABASE "{database}" ENCODING \'UTF8\' TEMPLATE template0;')
+    conn.close()
+
+    with open(init_sql, encoding='utf-8') as f:
+        schema = COPY_PATTERN.sub('', f.read())
+
+    conn = connect(server, database)
+    cursor = conn.cursor()
+    cursor.execute(schema)
+    cursor.execute(GENERATE_DATA, {
+        'books': scale,
+        'users': max(scale // 5, 100),
+        'orders': max(scale // 2, 100),
+        'carts': max(scale // 10, 100),
+        'queued': max(scale // 100, 10),
+        'words': list(TITLE_WORDS),
+    })
+    cursor.execute("VACUUM ANALYZE;")
+    return conn
+
+
+def probe_values(cursor, scale):
+    """Pick realistic arguments for the queries: the busiest users, an existing order, ..."""
+    cursor.execute("SELECT User_ID FROM ratings GROUP BY 1 ORDER BY COUNT(*) DESC, 1 LIMIT 1;")
+    reviewer = cursor.fetchone()[0]
+    cursor.execute("SELECT ISBN FROM ratings WHERE User_ID = %s LIMIT 1;", (reviewer,))
+    reviewed_isbn = cursor.fetchone()[0]
+    cursor.execute("SELECT User_ID FROM cart_items GROUP BY 1 ORDER BY COUNT(*) DESC, 1 LIMIT 1;")
+    shopper = cursor.fetchone()[0]
+    cursor.execute("SELECT ISBN FROM cart_items WHERE User_ID = %s LIMIT 1;", (shopper,))
+    cart_isbn = cursor.fetchone()[0]
+    cursor.execute("SELECT Order_ID, User_ID, EXTRACT(YEAR FROM Order_Date)::INTEGER FROM orders "
+                   "ORDER BY Order_ID DESC LIMIT 1;")
+    order_id, customer, year = cursor.fetchone()
+    cursor.execute("SELECT ISBN FROM inventory WHERE Quantity > 0 ORDER BY ISBN LIMIT 5;")
+    stocked_isbns = [row[0] for row in cursor.fetchall()]
+
+    return {
+        'isbn': str(scale // 2).zfill(10),
+        'isbns': [str(1 + i * scale // 50).zfill(10) for i in range(50)],
+        'reviewer': reviewer,
+        'reviewed_isbn': reviewed_isbn,
+        'shopper': shopper,
+        'cart_isbn': cart_isbn,
+        'order_id': order_id,
+        'customer': customer,
+        'year': year,
+        'stocked_isbns': stocked_isbns,
+    }
+
+
+def books_page(args):
+    page = backend.build_books_page_query(args)
+    return page['query'], page['params']
+
+
+def books_next_page(cursor, args):
+    page = backend.build_books_page_query(args)
+    cursor.execute(page['query'], page['params'])
+    next_cursor = backend.books_page_response(page, cursor.fetchall(), None, False)['next_cursor']
+    return books_page(dict(args, cursor=next_cursor))
+
+
+def books_count(search_query, search_mode):
+    search_filter, filter_params, _, _ = backend.build_search_filter(search_query, search_mode)
+    return backend.books_count_query(search_filter), tuple(filter_params)
+
+
+def endpoint_queries(cursor, probe):
+    """Return {name: (query, params)} for every read query the endpoints run."""
+    backend.count_cache.clear()
+    return {
+        'data-versions': (backend.DATA_VERSIONS_QUERY, (['catalog', 'inventory', 'ratings'],)),
+        'books': books_page({}),
+        'books.offset': books_page({'page': '100'}),
+        'books.cursor': books_next_page(cursor, {}),
+        'books.include-total': books_page({'include_total': 'true'}),
+        'books.search-basic': books_page({'q': SEARCH_TERM}),
+        'books.search-fulltext': books_page({'q': SEARCH_TERM, 'search_mode': 'fulltext'}),
+        'books.search-isbn': books_page({'q': probe['isbn'], 'search_mode': 'fulltext'}),
+        'total-books': books_count('', 'basic'),
+        'total-books.search-basic': books_count(SEARCH_TERM, 'basic'),
+        'total-books.search-fulltext': books_count(SEARCH_TERM, 'fulltext'),
+        'book': (backend.BOOK_DETAILS_QUERY, (probe['isbn'],)),
+        'books.batch': (backend.BOOKS_BATCH_QUERY, (probe['isbns'],)),
+        'reviews': backend.build_reviews_page_query(probe['reviewer'], {})[:2],
+        'total-reviews': (backend.TOTAL_REVIEWS_QUERY, (probe['reviewer'],)),
+        'book.review.status': (backend.REVIEW_STATUS_QUERY, (probe['reviewer'], probe['reviewed_isbn'])),
+        'cart': backend.build_cart_query(probe['shopper'], {}),
+        'total-cart': (backend.TOTAL_CART_QUERY, (probe['shopper'],)),
+        'cart.check': (backend.CART_CHECK_QUERY, (probe['shopper'], probe['cart_isbn'])),
+        'order.status': (
+            backend.ORDER_STATUS_QUERY,
+            (probe['order_id'], probe['customer'], probe['order_id'], probe['customer'])
+        ),
+        'stats.orders-per-month': (backend.ORDERS_PER_MONTH_QUERY, ()),
+        'stats.orders-per-month.year': (backend.ORDERS_PER_MONTH_IN_YEAR_QUERY, (probe['year'],)),
+        'stats.publisher-distribution': (backend.PUBLISHER_DISTRIBUTION_QUERY, ()),
+        'stats.earnings-per-month': (backend.EARNINGS_PER_MONTH_QUERY, (probe['year'],)),
+    }
+
+
+# Staging rows for the import merge: half update existing books, half are new
+IMPORT_STAGING_ROWS = """
+INSERT INTO book_import (Line_Number, ISBN, Book_Title, Book_Author, Year_Of_Publication, Publisher, Image_URL,
+                         Quantity, Price)
+SELECT
+    i,
+    CASE
+        WHEN MOD(i, 2) = 0 THEN LPAD((1 + MOD(i * 7919, %(books)s))::TEXT, 10, '0')
+        ELSE 'new' || LPAD(i::TEXT, 10, '0')
+    END,
+    'Imported ' || i,
+    'Author ' || i,
+    (1950 + MOD(i, 75))::TEXT,
+    'Publisher ' || MOD(i, 20),
+    '',
+    MOD(i, 50)::TEXT,
+    (5 + MOD(i, 55))::TEXT
+FROM GENERATE_SERIES(1, %(rows)s) i;
+"""
+IMPORT_ROWS = 1000
+
+
+def endpoint_write_queries(probe, scale):
+    """
+    Return {name: (setup, query, params)} for the hot write statements.
+
+    `setup` lists the (statement, params) to run in the same transaction
+    before the statement, which is always rolled back.
+    """
+    isbns = probe['stocked_isbns']
+    changes = [str(1 + i * scale // 1000).zfill(10) for i in range(1000)]
+    import_setup = (
+        (backend.BOOK_IMPORT_TABLE_QUERY, ()),
+        (IMPORT_STAGING_ROWS, {'books': scale, 'rows': IMPORT_ROWS}),
+        ("ANALYZE book_import;", ()),
+    )
+    return {
+        'order.lock-stock': ((), backend.ORDER_STOCK_LOCK_QUERY, (isbns,)),
+        'order.create': ((), backend.CREATE_ORDER_QUERY, {
+            'order_id': None,
+            'user_id': probe['shopper'],
+            'address': 'Benchmark 1',
+            'isbns': isbns,
+            'quantities': [1] * len(isbns),
+        }),
+        'inventory.update': (
+            (), backend.UPDATE_INVENTORY_QUERY,
+            (changes, [9.99] * len(changes), [None] * len(changes))
+        ),
+        'import.merge-books': (import_setup, backend.IMPORT_BOOKS_MERGE_QUERY, ()),
+        'import.merge-inventory': (
+            import_setup + ((backend.IMPORT_BOOKS_MERGE_QUERY, ()),), backend.IMPORT_INVENTORY_MERGE_QUERY, ()
+        ),
+    }
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+def estimate_error(node):
+    """How far off the planner's row estimate was, as a factor of at least 1."""
+    actual = node['Actual Rows'] * node['Actual Loops']
+    planned = node['Plan Rows'] * node['Actual Loops']
+    return max(actual + 1, planned + 1) / min(actual + 1, planned + 1)
+
+
+def execute(cursor, query, params, setup=None):
+    """
+    Run `query` and return its first row. With a `setup` (a write), it runs
+    after the setup statements in a transaction that is rolled back.
+    """
+    if setup is None:
+        cursor.execute(query, params)
+        return cursor.fetchone() if cursor.description else None
+
+    cursor.execute("BEGIN;")
+    try:
+        for statement, statement_params in setup:
+            cursor.execute(statement, statement_params)
+        cursor.execute(query, params)
+        return cursor.fetchone() if cursor.description else None
+    finally:
+        cursor.execute("ROLLBACK;")
+
+
+def explain(cursor, query, params, repeat, setup=None):
+    """
+    Run `query` under EXPLAIN (ANALYZE, BUFFERS) `repeat` times and summarize
+    the run with the median execution time.
+    """
+    runs = []
+    for _ in range(repeat):
+        runs.append(execute(cursor, "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params, setup)[0][0])
+
+    runs.sort(key=lambda run: run['Execution Time'])
+    median = runs[len(runs) // 2]
+    root = median['Plan']
+    nodes = list(plan_nodes(root))
+
+    return {
+        'executionMs': round(statistics.median(run['Execution Time'] for run in runs), 3),
+        'planningMs': round(statistics.median(run['Planning Time'] for run in runs), 3),
+        'planRows': root['Plan Rows'],
+        'actualRows': root['Actual Rows'],
+        'worstRowEstimateError': round(max(estimate_error(node) for node in nodes), 2),
+        'sharedHitBlocks': root.get('Shared Hit Blocks', 0),
+        'sharedReadBlocks': root.get('Shared Read Blocks', 0),
+        'seqScans': sorted({node['Relation Name'] for node in nodes if node['Node Type'] == 'Seq Scan'}),
+        'plan': median,
+    }
+
+
+def measure_scale(server, database, init_sql, scale, repeat):
+    started = time.monotonic()
+    conn = create_database(server, database, init_sql, scale)
+    print(f'Generated {scale} books in {time.monotonic() - started:.1f}s', file=sys.stderr)
+
+    try:
+        cursor = conn.cursor()
+        probe = probe_values(cursor, scale)
+        results = {}
+        queries = {name: (None, query, params) for name, (query, params) in endpoint_queries(cursor, probe).items()}
+        queries.update(endpoint_write_queries(probe, scale))
+        for name, (setup, query, params) in queries.items():
+            # One unmeasured run so every query starts from a warm cache
+            execute(cursor, query, params, setup)
+            results[name] = explain(cursor, query, params, repeat, setup)
+            print(f"  {name:32} {results[name]['executionMs']:>10.3f} ms", file=sys.stderr)
+        return results
+    finally:
+        conn.close()
+
+
+def regressions(base, head, threshold, min_delta_ms):
+    """Return a message for every query of `head` that regressed against `base`."""
+    failures = []
+    for scale, queries in sorted(head['scales'].items(), key=lambda item: int(item[0])):
+        for name, after in queries.items():
+            before = base['scales'].get(scale, {}).get(name)
+            if before is None:
+                continue
+
+            slower = after['executionMs'] - before['executionMs']
+            if slower > min_delta_ms and after['executionMs'] > before['executionMs'] * (1 + threshold):
+                failures.append(
+                    f"{name} at {scale} books: {before['executionMs']} ms -> {after['executionMs']} ms"
+                )
+
+            new_scans = set(after['seqScans']) - set(before['seqScans'])
+            if new_scans:
+                failures.append(f"{name} at {scale} books: new sequential scan of {', '.join(sorted(new_scans))}")
+
+    return failures
+
+
+def check(base, head, args):
+    failures = regressions(base, head, args.threshold, args.min_delta_ms)
+    for failure in failures:
+        print(f'REGRESSION {failure}', file=sys.stderr)
+    if failures:
+        sys.exit(1)
+    print('No query plan regressions', file=sys.stderr)
+
+
+def run(args):
+    scales = [int(scale) for scale in args.scales.split(',')]
+    database = os.getenv("PLANS_DB", "books_plans")
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'config': {'scales': scales, 'repeat': args.repeat},
+        'scales': {},
+    }
+
+    if args.use_env:
+        server = env_server()
+        for scale in scales:
+            report['scales'][str(scale)] = measure_scale(server, database, args.init_sql, scale, args.repeat)
+    else:
+        with EphemeralPostgres(args.pg_bin) as server:
+            for scale in scales:
+                report['scales'][str(scale)] = measure_scale(server, database, args.init_sql, scale, args.repeat)
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            check(json.load(f), report, args)
+
+
+def compare(args):
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.head, encoding='utf-8') as f:
+        head = json.load(f)
+
+    print(f"{'query':32} {'books':>8} {'base ms':>10} {'head ms':>10} {'change':>8}  seq scans")
+    for scale, queries in sorted(head['scales'].items(), key=lambda item: int(item[0])):
+        for name, after in queries.items():
+            before = base['scales'].get(scale, {}).get(name)
+            if before is None:
+                print(f"{name:32} {scale:>8} {'-':>10} {after['executionMs']:>10}")
+                continue
+            change = (after['executionMs'] - before['executionMs']) / before['executionMs'] if before['executionMs'] else 0
+            print(f"{name:32} {scale:>8} {before['executionMs']:>10} {after['executionMs']:>10} {change:>+8.0%}"
+                  f"  {', '.join(after['seqScans']) or '-'}")
+
+    check(base, head, args)
+
+
+def add_check_arguments(parser):
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='fail when a query gets slower by more than this fraction')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='ignore slowdowns smaller than this many milliseconds')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='generate data and explain every endpoint query')
+    run_parser.add_argument('--scales', default=','.join(str(scale) for scale in DEFAULT_SCALES),
+                            help='comma-separated catalog sizes in books')
+    run_parser.add_argument('--repeat', type=int, default=5, help='EXPLAIN ANALYZE runs per query')
+    run_parser.add_argument('--init-sql', default=os.path.join(DATABASE_DIR, 'init-database.sql'))
+    run_parser.add_argument('--pg-bin', help='directory with initdb and pg_ctl')
+    run_parser.add_argument('--use-env', action='store_true', help='use the POSTGRES_* server')
+    run_parser.add_argument('--baseline', help='fail on regressions against this report')
+    run_parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    add_check_arguments(run_parser)
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare', help='compare two JSON reports')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('head')
+    add_check_arguments(compare_parser)
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,5 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 CREATE TABLE IF NOT EXISTS books
 (
     ISBN                TEXT PRIMARY KEY,
@@ -5,9 +7,17 @@ CREATE TABLE IF NOT EXISTS books
     Book_Author         TEXT,
     Year_Of_Publication INTEGER,
     Publisher           TEXT,
-    Image_URL           TEXT
+    Image_URL           TEXT,
+    Search_Vector       TSVECTOR GENERATED ALWAYS AS (
+        SETWEIGHT(TO_TSVECTOR('english', COALESCE(Book_Title, '')), 'A') ||
+        SETWEIGHT(TO_TSVECTOR('english', COALESCE(Book_Author, '')), 'B')
+        ) STORED
 );
 
+CREATE INDEX IF NOT EXISTS books_search_vector_idx ON books USING GIN (Search_Vector);
+CREATE INDEX IF NOT EXISTS books_title_trgm_idx ON books USING GIN (Book_Title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS books_author_trgm_idx ON books USING GIN (Book_Author gin_trgm_ops);
+
 CREATE TABLE IF NOT EXISTS users
 (
     User_ID  SERIAL PRIMARY KEY,
@@ -16,6 +26,8 @@ CREATE TABLE IF NOT EXISTS users
     Role     TEXT CHECK (Role IN ('user', 'admin')) DEFAULT 'user'
 );
 
+CREATE UNIQUE INDEX IF NOT EXISTS users_username_key ON users (Username);
+
 CREATE TABLE IF NOT EXISTS ratings
 (
     User_ID     INTEGER REFERENCES users (User_ID) ON DELETE CASCADE,
@@ -24,6 +36,65 @@ CREATE TABLE IF NOT EXISTS ratings
     PRIMARY KEY (User_ID, ISBN)
 );
 
+CREATE INDEX IF NOT EXISTS ratings_isbn_idx ON ratings (ISBN);
+CREATE INDEX IF NOT EXISTS ratings_user_rating_idx ON ratings (User_ID, Book_Rating DESC, ISBN DESC);
+
+CREATE TABLE IF NOT EXISTS book_stats
+(
+    ISBN             TEXT REFERENCES books (ISBN) ON DELETE CASCADE,
+    Rating_Count     INTEGER NOT NULL DEFAULT 0,
+    Rating_Sum       INTEGER NOT NULL DEFAULT 0,
+    Rating_Histogram INTEGER[] NOT NULL DEFAULT ARRAY [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    Average_Rating   NUMERIC GENERATED ALWAYS AS (
+        CASE WHEN Rating_Count > 0 THEN Rating_Sum::NUMERIC / Rating_Count ELSE 0 END
+        ) STORED,
+    PRIMARY KEY (ISBN)
+);
+
+CREATE INDEX IF NOT EXISTS book_stats_rating_idx ON book_stats (Average_Rating DESC, ISBN DESC);
+
+-- Recomputes book_stats from scratch; a trigger on books keeps a row per book and add_book_review updates it incrementally
+CREATE OR REPLACE FUNCTION rebuild_book_stats() RETURNS INTEGER AS
+$$
+LOCK TABLE ratings IN SHARE MODE;
+DELETE FROM book_stats;
+INSERT INTO book_stats (ISBN, Rating_Count, Rating_Sum, Rating_Histogram)
+SELECT b.ISBN,
+       COUNT(r.Book_Rating),
+       COALESCE(SUM(r.Book_Rating), 0),
+       ARRAY [
+           COUNT(*) FILTER (WHERE r.Book_Rating = 0),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 1),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 2),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 3),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 4),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 5),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 6),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 7),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 8),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 9),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 10)
+           ]
+FROM books b
+         LEFT JOIN ratings r ON r.ISBN = b.ISBN
+GROUP BY b.ISBN;
+SELECT COUNT(*)::INTEGER FROM book_stats;
+$$ LANGUAGE SQL;
+
+-- Gives every new book its book_stats row, which /books inner joins on
+CREATE OR REPLACE FUNCTION add_book_stats() RETURNS TRIGGER AS
+$$
+BEGIN
+    INSERT INTO book_stats (ISBN) VALUES (NEW.ISBN) ON CONFLICT (ISBN) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER books_add_book_stats
+    AFTER INSERT ON books
+    FOR EACH ROW
+EXECUTE FUNCTION add_book_stats();
+
 CREATE TABLE IF NOT EXISTS inventory
 (
     ISBN     TEXT REFERENCES books (ISBN) ON DELETE CASCADE,
@@ -40,13 +111,63 @@ CREATE TABLE IF NOT EXISTS orders
     Order_Date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX IF NOT EXISTS orders_order_date_idx ON orders (Order_Date);
+CREATE INDEX IF NOT EXISTS orders_user_id_idx ON orders (User_ID);
+
 CREATE TABLE IF NOT EXISTS order_items
 (
-    Order_ID INTEGER REFERENCES orders (Order_ID) ON DELETE CASCADE,
-    ISBN     TEXT REFERENCES books (ISBN) ON DELETE CASCADE,
+    Order_ID   INTEGER REFERENCES orders (Order_ID) ON DELETE CASCADE,
+    ISBN       TEXT REFERENCES books (ISBN) ON DELETE CASCADE,
+    Quantity   INTEGER NOT NULL DEFAULT 1 CHECK (Quantity > 0),
+    Unit_Price NUMERIC CHECK (Unit_Price >= 0),
     PRIMARY KEY (Order_ID, ISBN)
 );
 
+CREATE INDEX IF NOT EXISTS order_items_isbn_idx ON order_items (ISBN);
+
+-- Monthly order totals, kept current by the order placement path.
+CREATE TABLE IF NOT EXISTS order_stats_monthly
+(
+    Month       DATE PRIMARY KEY,
+    Order_Count INTEGER NOT NULL DEFAULT 0,
+    Items_Sold  INTEGER NOT NULL DEFAULT 0,
+    Revenue     NUMERIC NOT NULL DEFAULT 0
+);
+
+-- Recomputes order_stats_monthly from the order history.
+CREATE OR REPLACE FUNCTION rebuild_order_stats_monthly() RETURNS INTEGER AS
+$$
+LOCK TABLE orders IN SHARE MODE;
+DELETE FROM order_stats_monthly;
+INSERT INTO order_stats_monthly (Month, Order_Count, Items_Sold, Revenue)
+SELECT DATE_TRUNC('month', o.Order_Date)::DATE,
+       COUNT(DISTINCT o.Order_ID),
+       COALESCE(SUM(oi.Quantity), 0),
+       COALESCE(SUM(oi.Quantity * oi.Unit_Price), 0)
+FROM orders o
+         LEFT JOIN order_items oi ON oi.Order_ID = o.Order_ID
+GROUP BY 1;
+SELECT COUNT(*)::INTEGER FROM order_stats_monthly;
+$$ LANGUAGE SQL;
+
+-- Orders accepted asynchronously by POST /order, drained by backend/order_worker.py
+CREATE TABLE IF NOT EXISTS order_queue
+(
+    Queue_ID        BIGSERIAL PRIMARY KEY,
+    Order_ID        INTEGER NOT NULL UNIQUE,
+    User_ID         INTEGER REFERENCES users (User_ID) ON DELETE CASCADE,
+    Idempotency_Key TEXT    NOT NULL,
+    Address         TEXT,
+    Items           JSONB   NOT NULL,
+    Status          TEXT CHECK (Status IN ('pending', 'completed', 'rejected')) DEFAULT 'pending',
+    Error           TEXT,
+    Created_At      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Processed_At    TIMESTAMP,
+    UNIQUE (User_ID, Idempotency_Key)
+);
+
+CREATE INDEX IF NOT EXISTS order_queue_pending_idx ON order_queue (Queue_ID) WHERE Status = 'pending';
+
 CREATE TABLE IF NOT EXISTS cart_items
 (
     User_ID INTEGER REFERENCES users (User_ID) ON DELETE CASCADE,
@@ -54,6 +175,22 @@ CREATE TABLE IF NOT EXISTS cart_items
     PRIMARY KEY (User_ID, ISBN)
 );
 
+CREATE INDEX IF NOT EXISTS cart_items_isbn_idx ON cart_items (ISBN);
+
+-- Change counters behind the backend's ETags, bumped by every write to the named data
+CREATE TABLE IF NOT EXISTS data_versions
+(
+    Name    TEXT PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 1
+);
+
+INSERT INTO data_versions (Name)
+VALUES ('catalog'),
+       ('inventory'),
+       ('ratings'),
+       ('orders')
+ON CONFLICT DO NOTHING;
+
 COPY books (ISBN, Book_Title, Book_Author, Year_Of_Publication, Publisher, Image_URL)
     FROM '/docker-entrypoint-initdb.d/books.csv'
     DELIMITER ',' CSV HEADER;
@@ -73,5 +210,7 @@ COPY inventory (ISBN, Quantity, Price)
     FROM '/docker-entrypoint-initdb.d/inventory.csv'
     DELIMITER ',' CSV HEADER;
 
+SELECT rebuild_book_stats();
+
 -- Adjust the sequence for User_ID to avoid conflicts with already existing users
 SELECT SETVAL('users_user_id_seq', (SELECT COALESCE(MAX(User_ID), 0) + 1 FROM users));
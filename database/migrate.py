@@ -0,0 +1,183 @@
+import logging
+import os
+import re
+import sys
+
+import psycopg2
+
+MIGRATIONS_DIR = os.getenv(
+    "MIGRATIONS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+)
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d+)_(\w+)\.sql$')
+NO_TRANSACTION_MARKER = '-- migrate:no-transaction'
+CONCURRENT_INDEX_PATTERN = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)', re.IGNORECASE
+)
+MIGRATION_LOCK_ID = 7340155
+
+logger = logging.getLogger("migrate")
+
+
+def load_migrations():
+    """
+    Return the migrations in MIGRATIONS_DIR as (version, name, sql), ordered by version.
+
+    Migration files are named <version>_<name>.sql. A file whose first line is
+    "-- migrate:no-transaction" runs outside a transaction, one statement at a
+    time, which CREATE INDEX CONCURRENTLY requires; its statements must each
+    end with a semicolon at the end of a line.
+    """
+    migrations = {}
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f'Duplicate migration version {version}: {filename}')
+
+        with open(os.path.join(MIGRATIONS_DIR, filename), encoding='utf-8') as f:
+            migrations[version] = (version, match.group(2), f.read())
+
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def split_statements(sql):
+    statements = []
+    current = []
+    for line in sql.splitlines():
+        if not current and (not line.strip() or line.strip().startswith('--')):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(';'):
+            statements.append("\n".join(current))
+            current = []
+
+    if current:
+        statements.append("\n".join(current))
+    return statements
+
+
+def drop_invalid_index(cursor, statement):
+    """
+    Drop the index a CREATE INDEX CONCURRENTLY statement builds if an earlier
+    failed run left it INVALID, since IF NOT EXISTS would otherwise skip it.
+    """
+    match = CONCURRENT_INDEX_PATTERN.search(statement)
+    if not match:
+        return
+
+    cursor.execute("""
+        SELECT 1
+        FROM pg_index
+        WHERE indexrelid = TO_REGCLASS(%s) AND NOT indisvalid;
+    """, (match.group(1),))
+    if cursor.fetchone():
+        logger.warning("Dropping invalid index %s", match.group(1))
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)};")
+
+
+def connect():
+    conn = psycopg2.connect(
+        host=os.getenv("POSTGRES_HOST"),
+        database=os.getenv("POSTGRES_DB"),
+        user=os.getenv("POSTGRES_USER"),
+        password=os.getenv("POSTGRES_PASSWORD"),
+    )
+    conn.autocommit = True
+    return conn
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations
+        (
+            Version    INTEGER PRIMARY KEY,
+            Name       TEXT NOT NULL,
+            Applied_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    cursor.execute("SELECT Version FROM schema_migrations;")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply_migration(conn, version, name, sql):
+    cursor = conn.cursor()
+
+    if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+        for statement in split_statements(sql):
+            drop_invalid_index(cursor, statement)
+            cursor.execute(statement)
+        cursor.execute("""
+            INSERT INTO schema_migrations (Version, Name)
+            VALUES (%s, %s);
+        """, (version, name))
+        return
+
+    conn.autocommit = False
+    try:
+        cursor.execute(sql)
+        cursor.execute("""
+            INSERT INTO schema_migrations (Version, Name)
+            VALUES (%s, %s);
+        """, (version, name))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.autocommit = True
+
+
+def migrate():
+    """
+    Apply every pending migration in version order and return how many ran.
+
+    Migrations are idempotent, so running them against a database created
+    from init-database.sql only records them: the rollup tables are rebuilt
+    only while empty or missing rows, and indexes on existing tables are
+    built concurrently.
+    A session advisory lock keeps concurrent runs from applying the same
+    migration twice.
+    """
+    migrations = load_migrations()
+    conn = connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_ID,))
+
+        applied = applied_versions(cursor)
+        pending = [migration for migration in migrations if migration[0] not in applied]
+
+        for version, name, sql in pending:
+            logger.info("Applying migration %04d_%s", version, name)
+            apply_migration(conn, version, name, sql)
+
+        cursor.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_ID,))
+        return len(pending)
+    finally:
+        conn.close()
+
+
+def status():
+    migrations = load_migrations()
+    conn = connect()
+    try:
+        applied = applied_versions(conn.cursor())
+    finally:
+        conn.close()
+
+    for version, name, _ in migrations:
+        print(f"{'applied' if version in applied else 'pending':8} {version:04d}_{name}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    if sys.argv[1:] == ['status']:
+        status()
+    elif not sys.argv[1:]:
+        logger.info("Applied %s migrations", migrate())
+    else:
+        sys.exit('usage: migrate.py [status]')
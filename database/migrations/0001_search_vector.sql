@@ -0,0 +1,12 @@
+-- Full-text and trigram search over book titles and authors.
+-- Adding the stored Search_Vector column rewrites books under an ACCESS
+-- EXCLUSIVE lock, blocking reads and writes of the table until it finishes:
+-- on an existing database, apply this migration during a maintenance window.
+-- Its indexes are built without blocking writes by 0009.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE books
+    ADD COLUMN IF NOT EXISTS Search_Vector TSVECTOR GENERATED ALWAYS AS (
+        SETWEIGHT(TO_TSVECTOR('english', COALESCE(Book_Title, '')), 'A') ||
+        SETWEIGHT(TO_TSVECTOR('english', COALESCE(Book_Author, '')), 'B')
+        ) STORED;
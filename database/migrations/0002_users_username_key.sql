@@ -0,0 +1,3 @@
+-- migrate:no-transaction
+-- Usernames are unique; registration relies on ON CONFLICT (Username).
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS users_username_key ON users (Username);
@@ -0,0 +1,45 @@
+-- Per-book rating aggregates.
+CREATE TABLE IF NOT EXISTS book_stats
+(
+    ISBN             TEXT REFERENCES books (ISBN) ON DELETE CASCADE,
+    Rating_Count     INTEGER NOT NULL DEFAULT 0,
+    Rating_Sum       INTEGER NOT NULL DEFAULT 0,
+    Rating_Histogram INTEGER[] NOT NULL DEFAULT ARRAY [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    Average_Rating   NUMERIC GENERATED ALWAYS AS (
+        CASE WHEN Rating_Count > 0 THEN Rating_Sum::NUMERIC / Rating_Count ELSE 0 END
+        ) STORED,
+    PRIMARY KEY (ISBN)
+);
+
+CREATE INDEX IF NOT EXISTS book_stats_rating_idx ON book_stats (Average_Rating DESC, ISBN DESC);
+
+-- Recomputes book_stats from scratch; add_book keeps a row per book and add_book_review updates it incrementally
+CREATE OR REPLACE FUNCTION rebuild_book_stats() RETURNS INTEGER AS
+$$
+LOCK TABLE ratings IN SHARE MODE;
+DELETE FROM book_stats;
+INSERT INTO book_stats (ISBN, Rating_Count, Rating_Sum, Rating_Histogram)
+SELECT b.ISBN,
+       COUNT(r.Book_Rating),
+       COALESCE(SUM(r.Book_Rating), 0),
+       ARRAY [
+           COUNT(*) FILTER (WHERE r.Book_Rating = 0),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 1),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 2),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 3),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 4),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 5),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 6),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 7),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 8),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 9),
+           COUNT(*) FILTER (WHERE r.Book_Rating = 10)
+           ]
+FROM books b
+         LEFT JOIN ratings r ON r.ISBN = b.ISBN
+GROUP BY b.ISBN;
+SELECT COUNT(*)::INTEGER FROM book_stats;
+$$ LANGUAGE SQL;
+
+-- Only fills a new table: rebuilding takes a SHARE lock on its source, blocking writes
+SELECT rebuild_book_stats() WHERE NOT EXISTS (SELECT 1 FROM book_stats);
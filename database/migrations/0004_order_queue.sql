@@ -0,0 +1,17 @@
+-- Durable queue for asynchronous order intake.
+CREATE TABLE IF NOT EXISTS order_queue
+(
+    Queue_ID        BIGSERIAL PRIMARY KEY,
+    Order_ID        INTEGER NOT NULL UNIQUE,
+    User_ID         INTEGER REFERENCES users (User_ID) ON DELETE CASCADE,
+    Idempotency_Key TEXT    NOT NULL,
+    Address         TEXT,
+    Items           JSONB   NOT NULL,
+    Status          TEXT CHECK (Status IN ('pending', 'completed', 'rejected')) DEFAULT 'pending',
+    Error           TEXT,
+    Created_At      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Processed_At    TIMESTAMP,
+    UNIQUE (User_ID, Idempotency_Key)
+);
+
+CREATE INDEX IF NOT EXISTS order_queue_pending_idx ON order_queue (Queue_ID) WHERE Status = 'pending';
@@ -0,0 +1,13 @@
+-- Change counters behind the ETags of cached GET routes.
+CREATE TABLE IF NOT EXISTS data_versions
+(
+    Name    TEXT PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 1
+);
+
+INSERT INTO data_versions (Name)
+VALUES ('catalog'),
+       ('inventory'),
+       ('ratings'),
+       ('orders')
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,11 @@
+-- Record the quantity and purchase-time unit price of every order line.
+ALTER TABLE order_items
+    ADD COLUMN IF NOT EXISTS Quantity   INTEGER NOT NULL DEFAULT 1 CHECK (Quantity > 0),
+    ADD COLUMN IF NOT EXISTS Unit_Price NUMERIC CHECK (Unit_Price >= 0);
+
+-- Lines placed before the prices were recorded are valued at the current price.
+UPDATE order_items oi
+SET Unit_Price = i.Price
+FROM inventory i
+WHERE i.ISBN = oi.ISBN
+  AND oi.Unit_Price IS NULL;
@@ -0,0 +1,27 @@
+-- Monthly order totals, kept current by the order placement path.
+CREATE TABLE IF NOT EXISTS order_stats_monthly
+(
+    Month       DATE PRIMARY KEY,
+    Order_Count INTEGER NOT NULL DEFAULT 0,
+    Items_Sold  INTEGER NOT NULL DEFAULT 0,
+    Revenue     NUMERIC NOT NULL DEFAULT 0
+);
+
+-- Recomputes order_stats_monthly from the order history.
+CREATE OR REPLACE FUNCTION rebuild_order_stats_monthly() RETURNS INTEGER AS
+$$
+LOCK TABLE orders IN SHARE MODE;
+DELETE FROM order_stats_monthly;
+INSERT INTO order_stats_monthly (Month, Order_Count, Items_Sold, Revenue)
+SELECT DATE_TRUNC('month', o.Order_Date)::DATE,
+       COUNT(DISTINCT o.Order_ID),
+       COALESCE(SUM(oi.Quantity), 0),
+       COALESCE(SUM(oi.Quantity * oi.Unit_Price), 0)
+FROM orders o
+         LEFT JOIN order_items oi ON oi.Order_ID = o.Order_ID
+GROUP BY 1;
+SELECT COUNT(*)::INTEGER FROM order_stats_monthly;
+$$ LANGUAGE SQL;
+
+-- Only fills a new table: rebuilding takes a SHARE lock on its source, blocking writes
+SELECT rebuild_order_stats_monthly() WHERE NOT EXISTS (SELECT 1 FROM order_stats_monthly);
@@ -0,0 +1,10 @@
+-- migrate:no-transaction
+-- Per-book rating lookups and cascading book deletes.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ratings_isbn_idx ON ratings (ISBN);
+-- A user's reviews in /reviews order, for the keyset pagination.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ratings_user_rating_idx ON ratings (User_ID, Book_Rating DESC, ISBN DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS orders_order_date_idx ON orders (Order_Date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS orders_user_id_idx ON orders (User_ID);
+-- Cascading book deletes; lookups by user are served by the primary keys.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS order_items_isbn_idx ON order_items (ISBN);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS cart_items_isbn_idx ON cart_items (ISBN);
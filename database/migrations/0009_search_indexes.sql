@@ -0,0 +1,5 @@
+-- migrate:no-transaction
+-- Full-text and trigram indexes for the search columns added by 0001.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS books_search_vector_idx ON books USING GIN (Search_Vector);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS books_title_trgm_idx ON books USING GIN (Book_Title gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS books_author_trgm_idx ON books USING GIN (Book_Author gin_trgm_ops);
@@ -44,11 +44,12 @@ export class BookService {
     });
   }
 
-  public getBooks(query: string, page: number = 1, limit: number = 10): Observable<any> {
+  public getBooks(query: string, page: number = 1, limit: number = 10, includeTotal: boolean = false): Observable<any> {
     const params = new HttpParams()
       .set('q', query)
       .set('page', page.toString())
-      .set('limit', limit.toString());
+      .set('limit', limit.toString())
+      .set('include_total', includeTotal.toString());
 
     return this.requestWithRefresh((headers) =>
       this.http.get<any>(`${this.baseUrl}/books`, {headers, params})
@@ -29,27 +29,18 @@ export class BooksComponent {
       const {q = ''} = params;
       this.searchQuery = q;
       this.currentPage = 1;
-      this.getTotalBooks();
-      this.getBooks();
+      this.getBooks(this.currentPage, true);
     });
   }
 
-  private getTotalBooks(): void {
-    this.bookService.getTotalBooks(this.searchQuery).subscribe({
-      next: (response) => {
-        this.totalBooks = response.totalBooks;
-        this.totalPages = Math.ceil(this.totalBooks / this.booksPerPage);
-      },
-      error: (error) => {
-        console.error('Error fetching total books', error);
-      }
-    });
-  }
-
-  private getBooks(page: number = this.currentPage): void {
-    this.bookService.getBooks(this.searchQuery, page, this.booksPerPage).subscribe({
+  private getBooks(page: number = this.currentPage, includeTotal: boolean = false): void {
+    this.bookService.getBooks(this.searchQuery, page, this.booksPerPage, includeTotal).subscribe({
       next: (response) => {
         this.books = response.books;
+        if (includeTotal) {
+          this.totalBooks = response.totalBooks;
+          this.totalPages = Math.ceil(this.totalBooks / this.booksPerPage);
+        }
       },
       error: (error) => {
         console.error(`Error fetching books for page ${page}`, error);